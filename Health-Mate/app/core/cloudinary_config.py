@@ -1,3 +1,4 @@
+import asyncio
 import cloudinary
 import cloudinary.uploader
 from .config import settings
@@ -15,7 +16,7 @@ def configure_cloudinary():
 async def upload_image(file_path: str) -> str:
     """Upload an image to Cloudinary and return the secure URL."""
     try:
-        result = cloudinary.uploader.upload(file_path, resource_type="image")
+        result = await asyncio.to_thread(cloudinary.uploader.upload, file_path, resource_type="image")
         return result.get("secure_url", "")
     except Exception as e:
         print(f"Cloudinary upload error: {e}")
@@ -25,7 +26,7 @@ async def upload_image(file_path: str) -> str:
 async def upload_image_from_bytes(file_bytes: bytes, filename: str) -> str:
     """Upload image bytes to Cloudinary."""
     try:
-        result = cloudinary.uploader.upload(file_bytes, resource_type="image")
+        result = await asyncio.to_thread(cloudinary.uploader.upload, file_bytes, resource_type="image")
         return result.get("secure_url", "")
     except Exception as e:
         print(f"Cloudinary upload error: {e}")
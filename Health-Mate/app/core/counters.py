@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import os
+from uuid import uuid4
+from . import redis as redis_module
+from . import database
+
+# Incrementally maintained dashboard counters
+# Writes bump Redis hashes (and a HyperLogLog of patients per doctor) so the
+# dashboards read O(1) data. A periodic reconciliation recomputes everything
+# from Mongo to correct drift from failed or missed increments.
+
+GLOBAL_KEY = "stats:global"
+RECONCILED_KEY = "stats:reconciled"
+RECONCILE_LOCK_KEY = "stats:reconcile_lock"
+DOCTOR_PREFIX = "stats:doctor:"
+RECONCILE_INTERVAL = int(os.getenv("COUNTER_RECONCILE_INTERVAL", "3600"))
+# Longer than a reconciliation takes, short enough that a crashed worker doesn't block the next run
+RECONCILE_LOCK_TTL = int(os.getenv("COUNTER_RECONCILE_LOCK_TTL", "600"))
+HLL_BATCH_SIZE = 1000
+# Redis commands queued per pipeline round trip during reconciliation
+RECONCILE_PIPELINE_SIZE = 1000
+
+# Delete the lock only if this worker still holds it
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def _doctor_key(doc_id: str) -> str:
+    return f"{DOCTOR_PREFIX}{doc_id}"
+
+
+def _patients_key(doc_id: str) -> str:
+    return f"stats:doctor:{doc_id}:patients"
+
+
+async def _apply(ops):
+    """Run a batch of counter updates; counters must never fail the write they describe."""
+    client = redis_module.redis_client
+    if not client:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        ops(pipe)
+        await pipe.execute()
+    except Exception as e:
+        logging.warning(f"Counter update failed: {e}")
+
+
+async def record_booking(doc_id: str, user_id: str):
+    def ops(pipe):
+        pipe.hincrby(GLOBAL_KEY, "appointments", 1)
+        pipe.hincrby(_doctor_key(doc_id), "appointments", 1)
+        pipe.pfadd(_patients_key(doc_id), user_id)
+    await _apply(ops)
+
+
+async def record_cancellation(doc_id: str, count: int = 1):
+    def ops(pipe):
+        pipe.hincrby(GLOBAL_KEY, "cancelled", count)
+        pipe.hincrby(_doctor_key(doc_id), "cancelled", count)
+    await _apply(ops)
+
+
+async def record_cancellations(per_doctor: dict):
+    """Record cancellations for several doctors at once, given {doc_id: count}."""
+    def ops(pipe):
+        pipe.hincrby(GLOBAL_KEY, "cancelled", sum(per_doctor.values()))
+        for doc_id, count in per_doctor.items():
+            pipe.hincrby(_doctor_key(doc_id), "cancelled", count)
+    if per_doctor:
+        await _apply(ops)
+
+
+async def record_completion(doc_id: str, amount: float, count: int = 1):
+    def ops(pipe):
+        pipe.hincrby(GLOBAL_KEY, "completed", count)
+        pipe.hincrbyfloat(GLOBAL_KEY, "earnings", amount)
+        pipe.hincrby(_doctor_key(doc_id), "completed", count)
+        pipe.hincrbyfloat(_doctor_key(doc_id), "earnings", amount)
+    await _apply(ops)
+
+
+async def record_user_registered():
+    await _apply(lambda pipe: pipe.hincrby(GLOBAL_KEY, "patients", 1))
+
+
+async def record_doctor_added():
+    await _apply(lambda pipe: pipe.hincrby(GLOBAL_KEY, "doctors", 1))
+
+
+def _parse(raw: dict) -> dict:
+    return {
+        "appointments": int(raw.get("appointments", 0)),
+        "completed": int(raw.get("completed", 0)),
+        "cancelled": int(raw.get("cancelled", 0)),
+        "earnings": float(raw.get("earnings", 0)),
+    }
+
+
+async def get_global_counters() -> dict | None:
+    """Read global counters, or None if they are unavailable or not yet reconciled."""
+    client = redis_module.redis_client
+    if not client:
+        return None
+    try:
+        reconciled, raw = await asyncio.gather(client.exists(RECONCILED_KEY), client.hgetall(GLOBAL_KEY))
+    except Exception as e:
+        logging.warning(f"Counter read failed: {e}")
+        return None
+    if not reconciled:
+        return None
+
+    counters = _parse(raw)
+    counters["patients"] = int(raw.get("patients", 0))
+    counters["doctors"] = int(raw.get("doctors", 0))
+    return counters
+
+
+async def get_doctor_counters(doc_id: str) -> dict | None:
+    """Read a doctor's counters, or None if they are unavailable or not yet reconciled."""
+    client = redis_module.redis_client
+    if not client:
+        return None
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.exists(RECONCILED_KEY)
+        pipe.hgetall(_doctor_key(doc_id))
+        pipe.pfcount(_patients_key(doc_id))
+        reconciled, raw, patients = await pipe.execute()
+    except Exception as e:
+        logging.warning(f"Counter read failed: {e}")
+        return None
+    if not reconciled:
+        return None
+
+    counters = _parse(raw)
+    counters["patients"] = patients
+    return counters
+
+
+class _BatchedPipeline:
+    """Queue Redis commands and send them a batch at a time, in order."""
+
+    def __init__(self, client, size: int = RECONCILE_PIPELINE_SIZE):
+        self.pipe = client.pipeline(transaction=False)
+        self.size = size
+        self.queued = 0
+
+    async def add(self, method: str, *args, **kwargs):
+        getattr(self.pipe, method)(*args, **kwargs)
+        self.queued += 1
+        if self.queued >= self.size:
+            await self.flush()
+
+    async def flush(self):
+        if self.queued:
+            await self.pipe.execute()
+            self.queued = 0
+
+
+async def reconcile_counters() -> bool:
+    """
+    Recompute every counter from Mongo and correct the Redis copies.
+    Runs in at most one worker at a time; returns False if another worker holds the lock.
+    """
+    client = redis_module.redis_client
+    if not client:
+        return False
+
+    token = uuid4().hex
+    if not await client.set(RECONCILE_LOCK_KEY, token, nx=True, ex=RECONCILE_LOCK_TTL):
+        logging.info("Counter reconciliation already running in another worker, skipping")
+        return False
+
+    try:
+        await _reconcile(client)
+    finally:
+        await client.eval(_RELEASE_LOCK, 1, RECONCILE_LOCK_KEY, token)
+
+    logging.info("✅ Dashboard counters reconciled")
+    return True
+
+
+async def _reconcile(client):
+    appointments = database.get_appointments_collection()
+
+    pipeline = [
+        {"$group": {
+            "_id": "$docId",
+            "appointments": {"$sum": 1},
+            "completed": {"$sum": {"$cond": ["$isCompleted", 1, 0]}},
+            "cancelled": {"$sum": {"$cond": ["$cancelled", 1, 0]}},
+            "earnings": {"$sum": {
+                "$cond": [{"$or": ["$isCompleted", "$payment"]}, {"$ifNull": ["$amount", 0]}, 0]
+            }},
+        }}
+    ]
+
+    totals = {"appointments": 0, "completed": 0, "cancelled": 0, "earnings": 0.0}
+    doc_ids = set()
+    # Taken before the aggregation so increments made while it runs can be kept
+    snapshot = await _snapshot_counters(client)
+    writes = _BatchedPipeline(client)
+
+    async for row in appointments.aggregate(pipeline):
+        doc_id = row["_id"]
+        if doc_id is None:
+            continue
+        doc_ids.add(doc_id)
+        values = {field: row[field] for field in totals}
+        for field in totals:
+            totals[field] += values[field]
+        await _correct(writes, _doctor_key(doc_id), values, snapshot.get(_doctor_key(doc_id), {}))
+
+    await _rebuild_patients(appointments, writes, doc_ids)
+
+    patients, doctors = await asyncio.gather(
+        database.get_users_collection().count_documents({}),
+        database.get_doctors_collection().count_documents({}),
+    )
+    await _correct(writes, GLOBAL_KEY, {**totals, "patients": patients, "doctors": doctors}, snapshot.get(GLOBAL_KEY, {}))
+    await writes.add("set", RECONCILED_KEY, 1)
+    await writes.flush()
+
+    await _remove_stale_doctors(client, doc_ids)
+
+
+async def _snapshot_counters(client) -> dict:
+    """Read the global and every doctor's counter hash, keyed by Redis key."""
+    keys = [GLOBAL_KEY]
+    async for key in client.scan_iter(match=f"{DOCTOR_PREFIX}*", count=1000):
+        # Skip the patient estimates, which live under the same prefix
+        if ":" not in key[len(DOCTOR_PREFIX):]:
+            keys.append(key)
+
+    snapshot = {}
+    for start in range(0, len(keys), RECONCILE_PIPELINE_SIZE):
+        batch = keys[start:start + RECONCILE_PIPELINE_SIZE]
+        pipe = client.pipeline(transaction=False)
+        for key in batch:
+            pipe.hgetall(key)
+        snapshot.update(zip(batch, await pipe.execute()))
+    return snapshot
+
+
+async def _correct(writes: _BatchedPipeline, key: str, values: dict, before: dict):
+    """
+    Move a counter hash from its snapshot to the recomputed values with
+    HINCRBY rather than HSET, so increments that record_booking and the other
+    writers made after the snapshot survive the correction. A write counted in
+    Mongo and incremented between the snapshot and the aggregation is counted
+    twice until the next reconciliation, which is far rarer than losing every
+    increment made while the aggregation runs.
+    """
+    for field, value in values.items():
+        if field == "earnings":
+            delta = float(value) - float(before.get(field, 0))
+            if delta:
+                await writes.add("hincrbyfloat", key, field, delta)
+        else:
+            delta = int(value) - int(before.get(field, 0))
+            if delta:
+                await writes.add("hincrby", key, field, delta)
+
+
+async def _rebuild_patients(appointments, writes: _BatchedPipeline, doc_ids: set):
+    """
+    Rebuild every doctor's patient HyperLogLog from one aggregation over
+    distinct (doctor, patient) pairs, sorted by doctor so each estimate is
+    built in a staging key and swapped in as soon as its doctor is done.
+    """
+    pipeline = [
+        {"$match": {"docId": {"$ne": None}, "userId": {"$ne": None}}},
+        {"$group": {"_id": {"docId": "$docId", "userId": "$userId"}}},
+        {"$sort": {"_id.docId": 1}},
+    ]
+
+    rebuilt = set()
+    current = None
+    batch = []
+
+    async def finish(doc_id, user_ids):
+        staging = f"{_patients_key(doc_id)}:rebuild"
+        if user_ids:
+            await writes.add("pfadd", staging, *user_ids)
+        # Swap in atomically so readers never see a half-built estimate
+        await writes.add("rename", staging, _patients_key(doc_id))
+        rebuilt.add(doc_id)
+
+    async for row in appointments.aggregate(pipeline, allowDiskUse=True):
+        doc_id, user_id = row["_id"]["docId"], row["_id"]["userId"]
+        if doc_id != current:
+            if current is not None:
+                await finish(current, batch)
+            current, batch = doc_id, []
+            await writes.add("delete", f"{_patients_key(doc_id)}:rebuild")
+        batch.append(user_id)
+        if len(batch) >= HLL_BATCH_SIZE:
+            await writes.add("pfadd", f"{_patients_key(doc_id)}:rebuild", *batch)
+            batch = []
+    if current is not None:
+        await finish(current, batch)
+
+    # Doctors whose appointments carry no patient ids have no estimate at all
+    for doc_id in doc_ids - rebuilt:
+        await writes.add("delete", _patients_key(doc_id))
+
+
+async def _remove_stale_doctors(client, doc_ids: set):
+    """
+    Unlink counter keys of doctors that no longer have any appointments.
+    A doctor's first booking racing this scan can lose its increment; the next
+    reconciliation restores it, like any other drift.
+    """
+    stale = []
+    async for key in client.scan_iter(match=f"{DOCTOR_PREFIX}*", count=1000):
+        doc_id = key[len(DOCTOR_PREFIX):].split(":", 1)[0]
+        if doc_id not in doc_ids:
+            stale.append(key)
+    for start in range(0, len(stale), RECONCILE_PIPELINE_SIZE):
+        await client.unlink(*stale[start:start + RECONCILE_PIPELINE_SIZE])
+    if stale:
+        logging.info(f"Removed {len(stale)} stale doctor counter keys")
+
+
+async def run_reconciliation_loop():
+    """Reconcile on startup and then every RECONCILE_INTERVAL seconds."""
+    while True:
+        try:
+            await reconcile_counters()
+        except Exception as e:
+            logging.error(f"❌ Counter reconciliation failed: {e}")
+        await asyncio.sleep(RECONCILE_INTERVAL)
@@ -2,6 +2,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import os
 import logging
+import asyncio
+from .mongo_monitoring import pool_stats, command_profiler
 
 load_dotenv()
 
@@ -9,6 +11,13 @@ load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 
+# Connection pool settings
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_CONNECTING = int(os.getenv("MONGO_MAX_CONNECTING", "2"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+
 client: AsyncIOMotorClient = None
 db = None
 
@@ -18,8 +27,15 @@ async def connect_to_mongo():
     try:
         client = AsyncIOMotorClient(
             MONGO_URI,
-            serverSelectionTimeoutMS=5000  # fail fast
+            serverSelectionTimeoutMS=5000,  # fail fast
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxConnecting=MONGO_MAX_CONNECTING,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            event_listeners=[pool_stats, command_profiler]
         )
+        command_profiler.attach(asyncio.get_running_loop(), client)
         await client.admin.command("ping")
 
         db = client["health_mate_db"]
@@ -36,6 +52,15 @@ async def close_mongo_connection():
         logging.info("🛑 MongoDB connection closed")
 
 
+def get_pool_stats() -> dict:
+    """Connection pool statistics for the Mongo client."""
+    return {
+        **pool_stats.snapshot(),
+        "max_pool_size": MONGO_MAX_POOL_SIZE,
+        "min_pool_size": MONGO_MIN_POOL_SIZE,
+    }
+
+
 # Collection helpers
 def get_users_collection():
     return db.users
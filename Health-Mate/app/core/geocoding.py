@@ -0,0 +1,71 @@
+import csv
+import os
+import re
+from pathlib import Path
+
+# Offline geocoding
+# Resolves place names in an address to coordinates using a local gazetteer
+# CSV (name,lat,lng), so doctor locations can be populated without calling
+# an external geocoding service.
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH", str(Path(__file__).resolve().parent.parent / "data" / "gazetteer.csv")
+)
+
+_gazetteer = None
+
+
+def load_gazetteer() -> dict:
+    """Load the gazetteer once, keyed by lower-cased place name."""
+    global _gazetteer
+    if _gazetteer is None:
+        places = {}
+        try:
+            with open(GAZETTEER_PATH, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    places[row["name"].strip().lower()] = (float(row["lat"]), float(row["lng"]))
+        except FileNotFoundError:
+            pass
+        _gazetteer = places
+    return _gazetteer
+
+
+def geocode(text: str) -> tuple[float, float] | None:
+    """Coordinates of the first gazetteer place named in text, preferring longer names."""
+    if not text:
+        return None
+    places = load_gazetteer()
+    normalized = " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+    for name in sorted(places, key=len, reverse=True):
+        if re.search(rf"\b{re.escape(name)}\b", normalized):
+            return places[name]
+    return None
+
+
+def to_point(lat: float, lng: float) -> dict:
+    """GeoJSON point; note GeoJSON orders coordinates as [longitude, latitude]."""
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("Coordinates out of range")
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def address_location(address: dict | None) -> dict | None:
+    """
+    GeoJSON location for a doctor address.
+    Explicit lat/lng on the address win; otherwise the address lines are geocoded.
+    """
+    if not address or not isinstance(address, dict):
+        return None
+
+    lat, lng = address.get("lat"), address.get("lng")
+    if lat not in (None, "") and lng not in (None, ""):
+        try:
+            return to_point(float(lat), float(lng))
+        except (TypeError, ValueError):
+            return None
+
+    text = " ".join(str(value) for key, value in address.items() if key not in ("lat", "lng") and value)
+    coordinates = geocode(text)
+    if coordinates is None:
+        return None
+    return to_point(*coordinates)
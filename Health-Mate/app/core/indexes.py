@@ -0,0 +1,71 @@
+import logging
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import PyMongoError
+from . import database
+
+# Required indexes per collection
+# Every hot query filters on one of these keys, so they must exist before
+# the collections grow large enough for a COLLSCAN to hurt.
+
+REQUIRED_INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "doctors": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("location", GEOSPHERE)], name="location_2dsphere"),
+    ],
+    "appointments": [
+        IndexModel([("docId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="docId_date"),
+        IndexModel([("userId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="userId_date"),
+        IndexModel([("date", DESCENDING), ("_id", DESCENDING)], name="date"),
+    ],
+}
+
+
+async def ensure_indexes():
+    """Create any missing required indexes. Safe to run on every startup."""
+    for collection_name, indexes in REQUIRED_INDEXES.items():
+        collection = database.db[collection_name]
+        failed = 0
+        # One call per index, so a single bad index (e.g. a unique index over
+        # existing duplicates) doesn't keep the others from being created
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                # createIndexes is a no-op for indexes that already exist with the same spec
+                await collection.create_indexes([index])
+            except PyMongoError as e:
+                failed += 1
+                logging.error(f"❌ Index creation failed for {collection_name}.{name}: {e}")
+        if not failed:
+            logging.info(f"✅ Indexes ready on {collection_name}")
+
+
+async def get_index_report() -> dict:
+    """Report missing, present and unused indexes for each managed collection."""
+    report = {}
+
+    for collection_name, indexes in REQUIRED_INDEXES.items():
+        collection = database.db[collection_name]
+
+        existing = await collection.index_information()
+
+        # $indexStats counts operations per index since the server (or index) started
+        usage = {}
+        async for stat in collection.aggregate([{"$indexStats": {}}]):
+            usage[stat["name"]] = stat.get("accesses", {}).get("ops", 0)
+
+        required_names = [index.document["name"] for index in indexes]
+
+        report[collection_name] = {
+            "missing": [name for name in required_names if name not in existing],
+            "present": sorted(existing.keys()),
+            "unused": sorted(
+                name for name, ops in usage.items()
+                if ops == 0 and name != "_id_"
+            ),
+            "usage": usage,
+        }
+
+    return report
@@ -0,0 +1,180 @@
+import functools
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+
+# Minimal Prometheus-style metrics registry
+# Everything runs on the event loop thread, so plain dicts are enough and the
+# hot path is a couple of dict lookups plus a bisect.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, labels: tuple = ()):
+        self._values[labels] = value
+
+
+class Histogram:
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[tuple]]):
+        """Register a callable yielding (name, type, help, value) for values owned elsewhere."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        for collector in self._collectors:
+            for name, type_name, documentation, value in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", ("method", "route")
+))
+service_latency = registry.register(Histogram(
+    "service_call_duration_seconds", "Service function latency.", ("function",)
+))
+service_errors = registry.register(Counter(
+    "service_call_errors_total", "Service function calls that raised.", ("function",)
+))
+
+
+class MetricsRoute(APIRoute):
+    """Route class that records count, latency and in-flight requests per route template."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def instrumented_handler(request: Request):
+            labels = (request.method, route)
+            status = 500
+            http_in_flight.inc(labels)
+            start = time.perf_counter()
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            except RequestValidationError:
+                # Raised before the endpoint runs; FastAPI turns it into a 422
+                status = 422
+                raise
+            finally:
+                http_latency.observe(time.perf_counter() - start, labels)
+                http_in_flight.dec(labels)
+                http_requests.inc((request.method, route, status))
+
+        return instrumented_handler
+
+
+def timed(func):
+    """Record the latency of an async service function."""
+    labels = (f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}",)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            service_errors.inc(labels)
+            raise
+        finally:
+            service_latency.observe(time.perf_counter() - start, labels)
+
+    return wrapper
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import sys
+from bson.int64 import Int64
+from pymongo import UpdateOne
+from . import database
+from .slots import decode_day, is_past
+from .geocoding import address_location
+from ..models.appointment_model import USER_SNAPSHOT_FIELDS, DOCTOR_SNAPSHOT_FIELDS
+
+# One-off data migrations
+# Run with: python -m app.core.migrations <name>
+
+
+async def compact_appointment_snapshots() -> int:
+    """Shrink embedded userData/docData on existing appointments to the snapshot fields."""
+    appointments = database.get_appointments_collection()
+
+    # Legacy snapshots always carried the doctor's "about" and the user's email
+    legacy = {"$or": [
+        {"docData.about": {"$exists": True}},
+        {"userData.email": {"$exists": True}},
+    ]}
+
+    # Pipeline update runs entirely on the server, nothing is transferred to the app
+    result = await appointments.update_many(legacy, [
+        {"$set": {
+            "userData": {field: f"$userData.{field}" for field in USER_SNAPSHOT_FIELDS},
+            "docData": {field: f"$docData.{field}" for field in DOCTOR_SNAPSHOT_FIELDS},
+        }}
+    ])
+
+    logging.info(f"✅ Compacted {result.modified_count} appointment snapshots")
+    return result.modified_count
+
+
+ENCODE_BATCH_SIZE = 500
+ENCODE_MAX_PASSES = 5
+
+
+def _has_slot_lists(doctor: dict) -> bool:
+    return any(isinstance(value, list) for value in (doctor.get("slots_booked") or {}).values())
+
+
+async def _encode_batch(doctors, batch: list) -> tuple[int, list]:
+    """Conditionally rewrite a batch of doctors; returns (converted, ids that changed since they were read)."""
+    operations = [
+        # Only replace the map if it has not changed since it was read
+        UpdateOne(
+            {"_id": doctor["_id"], "slots_booked": doctor["slots_booked"]},
+            {"$set": {"slots_booked": {
+                slot_date: Int64(decode_day(value))
+                for slot_date, value in doctor["slots_booked"].items()
+                if not is_past(slot_date)
+            }}}
+        )
+        for doctor in batch
+    ]
+    converted = (await doctors.bulk_write(operations, ordered=False)).modified_count
+    if converted == len(batch):
+        return converted, []
+
+    # Some filters missed; re-read the batch to find which doctors still hold lists
+    ids = [doctor["_id"] for doctor in batch]
+    skipped = [
+        doctor["_id"]
+        async for doctor in doctors.find({"_id": {"$in": ids}}, {"slots_booked": 1})
+        if _has_slot_lists(doctor)
+    ]
+    return converted, skipped
+
+
+async def encode_slot_bitmaps() -> int:
+    """
+    Rewrite list-valued slots_booked days as Int64 bitmaps, dropping past dates.
+    Doctors whose slots change between the read and the write are skipped by the
+    conditional update and retried in further passes until none are left.
+    """
+    doctors = database.get_doctors_collection()
+
+    converted = 0
+    query = {}
+    skipped = []
+
+    for attempt in range(1, ENCODE_MAX_PASSES + 1):
+        skipped = []
+        batch = []
+        async for doctor in doctors.find(query, {"slots_booked": 1}):
+            if not _has_slot_lists(doctor):
+                continue
+            batch.append(doctor)
+            if len(batch) >= ENCODE_BATCH_SIZE:
+                done, missed = await _encode_batch(doctors, batch)
+                converted += done
+                skipped += missed
+                batch = []
+        if batch:
+            done, missed = await _encode_batch(doctors, batch)
+            converted += done
+            skipped += missed
+
+        if not skipped:
+            break
+        logging.warning(f"{len(skipped)} doctors changed while being encoded (pass {attempt}), retrying them")
+        query = {"_id": {"$in": skipped}}
+
+    if skipped:
+        logging.error(
+            f"❌ {len(skipped)} doctors still have list-valued slots_booked after {ENCODE_MAX_PASSES} passes: "
+            f"{', '.join(str(doc_id) for doc_id in skipped)}"
+        )
+
+    logging.info(f"✅ Encoded slots_booked as bitmaps on {converted} doctors")
+    return converted
+
+
+async def backfill_doctor_locations() -> int:
+    """Set the GeoJSON location of doctors that have none, from their address."""
+    doctors = database.get_doctors_collection()
+
+    operations = []
+    located = 0
+    skipped = 0
+
+    async for doctor in doctors.find({"location": {"$exists": False}}, {"address": 1}):
+        location = address_location(doctor.get("address"))
+        if not location:
+            skipped += 1
+            continue
+
+        operations.append(UpdateOne(
+            {"_id": doctor["_id"], "location": {"$exists": False}},
+            {"$set": {"location": location}}
+        ))
+        if len(operations) >= 500:
+            located += (await doctors.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+
+    if operations:
+        located += (await doctors.bulk_write(operations, ordered=False)).modified_count
+
+    logging.info(f"✅ Located {located} doctors, {skipped} addresses could not be geocoded")
+    return located
+
+
+MIGRATIONS = {
+    "compact-appointments": compact_appointment_snapshots,
+    "encode-slot-bitmaps": encode_slot_bitmaps,
+    "backfill-doctor-locations": backfill_doctor_locations,
+}
+
+
+async def run(name: str):
+    await database.connect_to_mongo()
+    try:
+        await MIGRATIONS[name]()
+    finally:
+        await database.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
+
+    if len(sys.argv) != 2 or sys.argv[1] not in MIGRATIONS:
+        print(f"Usage: python -m app.core.migrations [{'|'.join(MIGRATIONS)}]")
+        sys.exit(1)
+
+    asyncio.run(run(sys.argv[1]))
@@ -0,0 +1,298 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from pymongo import monitoring
+
+# Connection pool instrumentation for the Motor client
+# Listeners are called from driver threads, so every counter update takes a lock.
+
+RATE_WINDOW_SECONDS = 60
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks checkouts, wait times and connection churn across all pools."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._created_at = deque()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.open = 0
+            self.checked_out = 0
+            self.created = 0
+            self.closed = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_total_seconds = 0.0
+            self.wait_max_seconds = 0.0
+            self.pools_cleared = 0
+            self._created_at.clear()
+
+    def _prune(self, now: float):
+        while self._created_at and now - self._created_at[0] > RATE_WINDOW_SECONDS:
+            self._created_at.popleft()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            return {
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "created": self.created,
+                "closed": self.closed,
+                "created_last_minute": len(self._created_at),
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_avg_seconds": self.wait_total_seconds / self.checkouts if self.checkouts else 0.0,
+                "wait_max_seconds": self.wait_max_seconds,
+                "pools_cleared": self.pools_cleared,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            now = time.monotonic()
+            self.open += 1
+            self.created += 1
+            self._created_at.append(now)
+            self._prune(now)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open = max(self.open - 1, 0)
+            self.closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        # duration (time spent waiting for the checkout) is reported by pymongo >= 4.7
+        wait = getattr(event, "duration", None) or 0.0
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_total_seconds += wait
+            self.wait_max_seconds = max(self.wait_max_seconds, wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+
+pool_stats = PoolStatsListener()
+
+
+# Command profiler
+# Records every profiled command's shape and timing, logs the slow ones, and can
+# run explain() on a sample of slow queries to flag collection scans. Settings can
+# be changed at runtime through configure().
+
+PROFILER_ENABLED = os.getenv("MONGO_PROFILER_ENABLED", "true").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+EXPLAIN_SAMPLE_RATE = float(os.getenv("MONGO_EXPLAIN_SAMPLE_RATE", "0"))
+SLOW_QUERY_LOG_SIZE = 100
+
+PROFILED_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete", "getMore"}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+
+# Driver-added fields that explain() does not accept inside the wrapped command
+_SESSION_FIELDS = {"$db", "lsid", "$clusterTime", "$readPreference", "txnNumber", "readConcern", "$audit"}
+
+
+def redact(value):
+    """Keep the structure and operators of a filter but drop the values."""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(value[0])] if value else []
+    return "?"
+
+
+def _command_filter(name: str, command) -> dict | None:
+    if name == "find":
+        return command.get("filter", {})
+    if name in ("count", "distinct", "findAndModify"):
+        return command.get("query", {})
+    if name == "aggregate":
+        for stage in command.get("pipeline", []):
+            if "$match" in stage:
+                return stage["$match"]
+        return {}
+    if name == "update":
+        updates = command.get("updates") or [{}]
+        return updates[0].get("q", {})
+    if name == "delete":
+        deletes = command.get("deletes") or [{}]
+        return deletes[0].get("q", {})
+    return None
+
+
+def _returned_docs(reply) -> int:
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "values" in reply:
+        return len(reply["values"])
+    return reply.get("n", 0)
+
+
+def _plan_stages(plan) -> set:
+    stages = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.add(node["stage"])
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return stages
+
+
+class CommandProfiler(monitoring.CommandListener):
+    """Records command timings and shapes and logs slow queries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._loop = None
+        self._client = None
+        self.enabled = PROFILER_ENABLED
+        self.slow_ms = SLOW_QUERY_THRESHOLD_MS
+        self.explain_sample_rate = EXPLAIN_SAMPLE_RATE
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self.commands = 0
+        self.slow = 0
+        self.collscans = 0
+
+    def attach(self, loop, client):
+        """Give the profiler an event loop and client to run explain() with."""
+        self._loop = loop
+        self._client = client
+
+    def configure(self, enabled: bool = None, slow_ms: float = None, explain_sample_rate: float = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if explain_sample_rate is not None:
+            self.explain_sample_rate = min(max(explain_sample_rate, 0.0), 1.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "slow_ms": self.slow_ms,
+                "explain_sample_rate": self.explain_sample_rate,
+                "commands": self.commands,
+                "slow": self.slow,
+                "collscans": self.collscans,
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def started(self, event):
+        name = event.command_name
+        if not self.enabled or name not in PROFILED_COMMANDS:
+            return
+
+        command = event.command
+        collection = command.get("collection") if name == "getMore" else command.get(name)
+        query_filter = _command_filter(name, command)
+
+        # Only a sampled fraction keeps a copy of the command for explain()
+        explain_command = None
+        if name in EXPLAINABLE_COMMANDS and self.explain_sample_rate and random.random() < self.explain_sample_rate:
+            explain_command = {key: value for key, value in command.items() if key not in _SESSION_FIELDS}
+
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                name,
+                collection,
+                redact(query_filter) if query_filter is not None else None,
+                explain_command,
+                event.database_name,
+            )
+
+    def succeeded(self, event):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+
+        name, collection, shape, explain_command, database_name = pending
+        duration_ms = event.duration_micros / 1000
+
+        with self._lock:
+            self.commands += 1
+            if duration_ms < self.slow_ms:
+                return
+            self.slow += 1
+            record = {
+                "command": name,
+                "collection": collection,
+                "filter": shape,
+                "duration_ms": round(duration_ms, 3),
+                "docs_returned": _returned_docs(event.reply),
+                "at": time.time(),
+            }
+            self.slow_queries.append(record)
+
+        logging.warning(
+            f"🐢 Slow query {name} on {collection} took {duration_ms:.1f} ms "
+            f"(filter={shape}, docs={record['docs_returned']})"
+        )
+
+        if explain_command and self._loop and self._client:
+            asyncio.run_coroutine_threadsafe(
+                self._explain(database_name, explain_command, record), self._loop
+            )
+
+    def failed(self, event):
+        with self._lock:
+            self._pending.pop((event.connection_id, event.request_id), None)
+
+    async def _explain(self, database_name: str, command: dict, record: dict):
+        try:
+            result = await self._client[database_name].command(
+                {"explain": command, "verbosity": "queryPlanner"}
+            )
+        except Exception as e:
+            logging.warning(f"explain() failed for {record['command']} on {record['collection']}: {e}")
+            return
+
+        stages = _plan_stages(result.get("queryPlanner", result))
+        record["plan_stages"] = sorted(stages)
+        if "COLLSCAN" in stages:
+            with self._lock:
+                self.collscans += 1
+            logging.warning(f"❌ COLLSCAN on {record['collection']} for filter {record['filter']}")
+
+
+command_profiler = CommandProfiler()
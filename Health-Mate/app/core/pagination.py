@@ -0,0 +1,90 @@
+import base64
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Keyset (cursor) pagination helpers shared by the list endpoints
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client supplies a cursor we did not issue."""
+
+
+def clamp_limit(limit: int | None) -> int:
+    """Keep a requested page size within the allowed bounds."""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_LIMIT
+    return min(limit, MAX_PAGE_LIMIT)
+
+
+def encode_cursor(doc: dict, sort_field: str) -> str:
+    """Build an opaque cursor pointing just after the given document."""
+    payload = {"id": str(doc["_id"])}
+    if sort_field != "_id":
+        payload["v"] = doc.get(sort_field)
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str) -> dict:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        payload["id"] = ObjectId(payload["id"])
+    except (ValueError, TypeError, KeyError, InvalidId) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+    if sort_field != "_id" and "v" not in payload:
+        raise InvalidCursorError("Invalid cursor")
+    return payload
+
+
+def keyset_filter(cursor: str, sort_field: str, direction: int) -> dict:
+    """Translate a cursor into a filter selecting the documents after it."""
+    position = decode_cursor(cursor, sort_field)
+    op = "$lt" if direction < 0 else "$gt"
+
+    if sort_field == "_id":
+        return {"_id": {op: position["id"]}}
+
+    # Ties on the sort field are broken by _id so pages never overlap
+    return {"$or": [
+        {sort_field: {op: position["v"]}},
+        {sort_field: position["v"], "_id": {op: position["id"]}}
+    ]}
+
+
+async def paginate(
+    collection,
+    query: dict,
+    limit: int | None = None,
+    cursor: str | None = None,
+    sort_field: str = "_id",
+    direction: int = 1,
+    projection: dict | None = None
+) -> tuple[list, str | None]:
+    """
+    Fetch one page of documents ordered by (sort_field, _id).
+    Returns the documents and the cursor for the next page (None on the last page).
+    """
+    limit = clamp_limit(limit)
+
+    page_query = query
+    if cursor:
+        page_query = {"$and": [query, keyset_filter(cursor, sort_field, direction)]}
+
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+
+    # Fetch one extra document to learn whether another page exists
+    docs = await collection.find(page_query, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+
+    return docs, next_cursor
@@ -1,6 +1,51 @@
+import os
+import time
 import redis.asyncio as redis
 from .config import settings
 
+# Connection pool settings
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """Blocking pool that records connection creation and checkout wait times."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created = 0
+        self.checkouts = 0
+        self.wait_total_seconds = 0.0
+        self.wait_max_seconds = 0.0
+
+    def make_connection(self):
+        self.created += 1
+        return super().make_connection()
+
+    async def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        connection = await super().get_connection(*args, **kwargs)
+        wait = time.perf_counter() - start
+        self.checkouts += 1
+        self.wait_total_seconds += wait
+        self.wait_max_seconds = max(self.wait_max_seconds, wait)
+        return connection
+
+    def stats(self) -> dict:
+        in_use = len(self._in_use_connections)
+        return {
+            "open": len(self._available_connections) + in_use,
+            "checked_out": in_use,
+            "created": self.created,
+            "checkouts": self.checkouts,
+            "wait_avg_seconds": self.wait_total_seconds / self.checkouts if self.checkouts else 0.0,
+            "wait_max_seconds": self.wait_max_seconds,
+            "max_connections": self.max_connections,
+        }
+
+
 # Redis client
 redis_client: redis.Redis = None
 
@@ -9,7 +54,15 @@ async def connect_to_redis():
     """Connect to Redis on startup."""
     global redis_client
     try:
-        redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        pool = InstrumentedConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL
+        )
+        redis_client = redis.Redis(connection_pool=pool)
         # Verify connection
         await redis_client.ping()
         print("Redis Connected")
@@ -32,28 +85,9 @@ def get_redis():
     return redis_client
 
 
-async def store_session(user_id: str, token: str, expires: int = 86400):
-    """Store a user session in Redis."""
+def get_pool_stats() -> dict | None:
+    """Connection pool statistics for the Redis client."""
     if redis_client:
-        await redis_client.setex(f"session:{user_id}", expires, token)
-
-
-async def get_session(user_id: str) -> str | None:
-    """Get a user session from Redis."""
-    if redis_client:
-        return await redis_client.get(f"session:{user_id}")
+        return redis_client.connection_pool.stats()
     return None
 
-
-async def delete_session(user_id: str):
-    """Delete a user session from Redis."""
-    if redis_client:
-        await redis_client.delete(f"session:{user_id}")
-
-
-async def is_token_valid(user_id: str, token: str) -> bool:
-    """Check if a token is valid in Redis."""
-    if redis_client:
-        stored_token = await get_session(user_id)
-        return stored_token == token
-    return True  # If Redis is not available, assume valid
@@ -0,0 +1,36 @@
+from typing import Any
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.responses import JSONResponse
+
+# orjson-backed JSON responses
+# orjson serializes datetimes, UUIDs and dataclasses itself; the default hook
+# only covers the BSON types Motor hands back, so documents can be returned
+# without converting every _id first.
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class for the app.
+    Returning an instance directly from a route also skips FastAPI's
+    jsonable_encoder pass, which dominates the cost of large list payloads.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
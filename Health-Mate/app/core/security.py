@@ -1,6 +1,10 @@
 from passlib.context import CryptoContext
 from jose import jwt
+from fastapi import HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
+import time
 from datetime import datetime,timedelta
 from dotenv import load_env
 
@@ -17,6 +21,90 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed_password: str) -> bool:
     return pwd_context.verify(password, hashed_password)
 
+
+# Password hashing executor
+# bcrypt takes 100-300 ms per call, so it runs on a dedicated pool instead of the event loop
+
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", "4"))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", "64"))
+HASH_QUEUE_TIMEOUT = float(os.getenv("HASH_QUEUE_TIMEOUT", "2"))
+
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_POOL_SIZE, thread_name_prefix="bcrypt")
+_hash_slots: asyncio.Semaphore = None
+
+hash_stats = {
+    "in_flight": 0,
+    "queued": 0,
+    "completed": 0,
+    "rejected": 0,
+    "total_seconds": 0.0,
+    "max_seconds": 0.0,
+}
+
+
+def _get_hash_slots() -> asyncio.Semaphore:
+    # Created lazily so it binds to the running event loop
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(HASH_POOL_SIZE + HASH_QUEUE_SIZE)
+    return _hash_slots
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+async def _run_hashing(func, *args):
+    """Run a bcrypt call on the hashing pool, rejecting work when the queue is full."""
+    slots = _get_hash_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        hash_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"success": False, "message": "Server busy, please try again"}
+        )
+
+    hash_stats["in_flight"] += 1
+    hash_stats["queued"] = max(hash_stats["in_flight"] - HASH_POOL_SIZE, 0)
+    try:
+        loop = asyncio.get_running_loop()
+        result, elapsed = await loop.run_in_executor(_hash_executor, _timed, func, *args)
+        hash_stats["completed"] += 1
+        hash_stats["total_seconds"] += elapsed
+        hash_stats["max_seconds"] = max(hash_stats["max_seconds"], elapsed)
+        return result
+    finally:
+        hash_stats["in_flight"] -= 1
+        hash_stats["queued"] = max(hash_stats["in_flight"] - HASH_POOL_SIZE, 0)
+        slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    return await _run_hashing(verify_password, password, hashed_password)
+
+
+def get_hash_stats() -> dict:
+    """Snapshot of the hashing pool for monitoring."""
+    completed = hash_stats["completed"]
+    return {
+        **hash_stats,
+        "pool_size": HASH_POOL_SIZE,
+        "queue_size": HASH_QUEUE_SIZE,
+        "avg_seconds": hash_stats["total_seconds"] / completed if completed else 0.0,
+    }
+
+
+def shutdown_hashing_executor():
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
 def create_access_token(user_id: str):
     payload = {
         "id": user_id,
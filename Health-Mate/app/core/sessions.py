@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import redis.asyncio as redis
+from . import redis as redis_module
+from .cache import TTLCache
+from .config import settings
+
+# Session store
+# Each user (or doctor) has a sorted set "sessions:{id}" of session ids scored
+# by expiry, so several devices can be logged in at once. Session ids are token
+# hashes; raw tokens are never stored.
+#
+# Validity checks are served from a local cache that Redis keeps coherent
+# through server-assisted client-side caching: a tracking connection runs
+# CLIENT TRACKING in BCAST mode for the "sessions:" prefix and redirects
+# invalidations to a listener subscribed to __redis__:invalidate. The cache is
+# only consulted while that listener is connected.
+
+# When enabled, a valid JWT must also belong to a live session in the session
+# store, so revoked sessions are rejected before the token expires. When off,
+# sessions are still recorded but revoking them has no effect on requests.
+SESSION_ENFORCEMENT = os.getenv("SESSION_ENFORCEMENT", "false").lower() == "true"
+
+SESSION_PREFIX = "sessions:"
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+MAX_SESSIONS_PER_USER = int(os.getenv("MAX_SESSIONS_PER_USER", "10"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+# Safety net only; invalidation messages normally evict entries first
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "300"))
+TRACKING_RETRY_SECONDS = 5
+
+_session_cache = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+_tracking_active = False
+_tracking_task: asyncio.Task = None
+# Bumped on every invalidation, so a read that raced one is not cached
+_epoch = 0
+
+session_stats = {"checks": 0, "cache_hits": 0, "invalidations": 0}
+
+
+def _key(user_id: str) -> str:
+    return f"{SESSION_PREFIX}{user_id}"
+
+
+def session_id(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _forget(user_ids):
+    """
+    Drop local cache entries after this process changed them, without waiting
+    for the invalidation message, and stop in-flight reads from caching stale data.
+    """
+    global _epoch
+    _epoch += 1
+    for user_id in user_ids:
+        _session_cache.pop(user_id)
+
+
+async def store_session(user_id: str, token: str, expires: int = SESSION_TTL):
+    """Record a new session for a user, dropping expired and excess old sessions, in one round trip."""
+    client = redis_module.redis_client
+    if not client:
+        return
+
+    now = time.time()
+    key = _key(user_id)
+    pipe = client.pipeline(transaction=True)
+    pipe.zremrangebyscore(key, "-inf", now)
+    pipe.zadd(key, {session_id(token): now + expires})
+    # Keep only the sessions expiring last
+    pipe.zremrangebyrank(key, 0, -(MAX_SESSIONS_PER_USER + 1))
+    # The newest session always expires last, so the key can live exactly as long
+    pipe.expire(key, expires)
+    await pipe.execute()
+    _forget([user_id])
+
+
+async def _load_sessions(user_ids: list) -> dict:
+    """{user_id: {session_id: expiry}} for several users, from cache where possible and one pipeline otherwise."""
+    sessions = {}
+    missing = []
+
+    for user_id in user_ids:
+        cached = _session_cache.get(user_id) if _tracking_active else None
+        if cached is not None:
+            session_stats["cache_hits"] += 1
+            sessions[user_id] = cached
+        else:
+            missing.append(user_id)
+
+    if missing:
+        epoch = _epoch
+        pipe = redis_module.redis_client.pipeline(transaction=False)
+        for user_id in missing:
+            pipe.zrange(_key(user_id), 0, -1, withscores=True)
+        results = await pipe.execute()
+
+        for user_id, members in zip(missing, results):
+            entries = dict(members)
+            sessions[user_id] = entries
+            if _tracking_active and epoch == _epoch:
+                _session_cache.set(user_id, entries)
+
+    return sessions
+
+
+async def is_session_valid(user_id: str, token: str) -> bool:
+    """Check that a token belongs to a live session of the user."""
+    if not redis_module.redis_client:
+        return True  # If Redis is not available, assume valid
+
+    session_stats["checks"] += 1
+    try:
+        sessions = (await _load_sessions([user_id]))[user_id]
+    except Exception as e:
+        # Same as running without Redis: the JWT signature alone decides
+        logging.warning(f"Session check failed, allowing token: {e}")
+        return True
+    expiry = sessions.get(session_id(token))
+    return expiry is not None and expiry > time.time()
+
+
+async def revoke_user_sessions(user_ids: list) -> int:
+    """End every session of the given users; returns how many users had sessions."""
+    client = redis_module.redis_client
+    if not client or not user_ids:
+        return 0
+
+    # UNLINK frees memory off the main thread and takes many keys in one command
+    revoked = await client.unlink(*[_key(user_id) for user_id in user_ids])
+    _forget(user_ids)
+    return revoked
+
+
+def _invalidate(keys):
+    global _epoch
+    _epoch += 1
+    session_stats["invalidations"] += 1
+    # A null payload means the server flushed its keyspace
+    if keys is None:
+        _session_cache.clear()
+        return
+    if isinstance(keys, str):
+        keys = [keys]
+    for key in keys:
+        if key.startswith(SESSION_PREFIX):
+            _session_cache.pop(key[len(SESSION_PREFIX):])
+
+
+async def _track_invalidations():
+    """Keep a tracking/listener connection pair alive and apply invalidations to the local cache."""
+    global _tracking_active
+
+    while True:
+        listener = tracker = None
+        try:
+            options = dict(decode_responses=True, single_connection_client=True, health_check_interval=0)
+            listener = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=None, **options)
+            tracker = redis.Redis.from_url(settings.REDIS_URL, **options)
+
+            listener_id = await listener.client_id()
+            await tracker.execute_command(
+                "CLIENT", "TRACKING", "ON", "REDIRECT", listener_id, "BCAST", "PREFIX", SESSION_PREFIX
+            )
+
+            # RESP2 delivers invalidations as pub/sub messages on the redirect connection
+            connection = listener.connection
+            await connection.send_command("SUBSCRIBE", "__redis__:invalidate")
+            await connection.read_response()
+
+            # Anything cached before tracking started may be stale
+            _session_cache.clear()
+            _tracking_active = True
+            logging.info("✅ Session cache invalidation tracking enabled")
+
+            while True:
+                message = await connection.read_response()
+                if isinstance(message, list) and len(message) == 3 and message[0] == "message":
+                    _invalidate(message[2])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f"Session tracking lost, local session cache disabled: {e}")
+        finally:
+            _tracking_active = False
+            _session_cache.clear()
+            for client in (listener, tracker):
+                if client:
+                    try:
+                        await client.close()
+                    except Exception:
+                        pass
+
+        await asyncio.sleep(TRACKING_RETRY_SECONDS)
+
+
+def start_session_tracking():
+    global _tracking_task
+    if redis_module.redis_client and _tracking_task is None:
+        _tracking_task = asyncio.create_task(_track_invalidations())
+
+
+async def stop_session_tracking():
+    global _tracking_task
+    if _tracking_task:
+        _tracking_task.cancel()
+        try:
+            await _tracking_task
+        except asyncio.CancelledError:
+            pass
+        _tracking_task = None
+
+
+def get_session_stats() -> dict:
+    return {
+        **session_stats,
+        "cached_users": len(_session_cache),
+        "tracking": _tracking_active,
+        "enforcement": SESSION_ENFORCEMENT,
+    }
@@ -0,0 +1,73 @@
+import asyncio
+import functools
+from .metrics import registry, Counter
+
+# Request coalescing
+# Concurrent calls with the same arguments share one in-flight execution, so a
+# burst of identical requests on a cache miss costs one database round trip.
+# Results are shared between callers and must be treated as read-only.
+
+singleflight_calls = registry.register(Counter(
+    "singleflight_calls_total", "Calls to single-flight wrapped functions.", ("function",)
+))
+singleflight_coalesced = registry.register(Counter(
+    "singleflight_coalesced_total", "Calls served by joining an execution already in flight.", ("function",)
+))
+
+_groups = {}
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        labels = (self.name,)
+        self.calls += 1
+        singleflight_calls.inc(labels)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            # A task, not a bare await, so one caller being cancelled never cancels the others
+            task = asyncio.create_task(func(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._finish, key))
+        else:
+            self.coalesced += 1
+            singleflight_coalesced.inc(labels)
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
+
+
+def single_flight(func):
+    """Coalesce concurrent calls of an async function that share the same arguments."""
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+    group = _groups[name] = SingleFlight(name)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        return await group.do(key, func, *args, **kwargs)
+
+    return wrapper
+
+
+def get_singleflight_stats() -> dict:
+    return {group.name: group.stats() for group in _groups.values()}
@@ -0,0 +1,127 @@
+import os
+from datetime import date, datetime
+from functools import lru_cache
+
+# Slot codec
+# slots_booked stores one Int64 bitmap per date, so {"5_3_2025": 1 << 20} means
+# only 10:00 AM is booked on 5 March 2025.
+# A day is divided into fixed SLOT_MINUTES slots; slot i of a day is bit i of
+# that day's bitmap. slotDate strings use the frontend's "day_month_year" format
+# (e.g. "5_3_2025") and slotTime strings its "10:30 AM" format.
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+SLOT_DAY_START = os.getenv("SLOT_DAY_START", "10:00")
+SLOT_DAY_END = os.getenv("SLOT_DAY_END", "21:00")
+
+_DATE_FORMATS = ("%d_%m_%Y", "%Y-%m-%d")
+_TIME_FORMATS = ("%I:%M %p", "%H:%M")
+
+
+# Dates and times repeat across every doctor, so parsing is memoized; an index
+# rebuild would otherwise spend most of its time in strptime
+@lru_cache(maxsize=4096)
+def parse_slot_date(slot_date: str) -> date:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(slot_date, fmt).date()
+        except (ValueError, TypeError):
+            continue
+    raise ValueError(f"Invalid slot date: {slot_date}")
+
+
+def format_slot_date(day: date) -> str:
+    return f"{day.day}_{day.month}_{day.year}"
+
+
+@lru_cache(maxsize=1024)
+def parse_slot_time(slot_time: str) -> int:
+    """Convert a slot time string to its slot index within the day."""
+    for fmt in _TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(slot_time.strip(), fmt)
+        except (ValueError, TypeError, AttributeError):
+            continue
+        minutes = parsed.hour * 60 + parsed.minute
+        if minutes % SLOT_MINUTES:
+            raise ValueError(f"Slot time not on a {SLOT_MINUTES}-minute boundary: {slot_time}")
+        return minutes // SLOT_MINUTES
+    raise ValueError(f"Invalid slot time: {slot_time}")
+
+
+_SLOT_LABELS = tuple(
+    datetime(2000, 1, 1, *divmod(index * SLOT_MINUTES, 60)).strftime("%I:%M %p")
+    for index in range(SLOTS_PER_DAY)
+)
+
+
+def format_slot_time(index: int) -> str:
+    return _SLOT_LABELS[index]
+
+
+def slot_mask(index: int) -> int:
+    return 1 << index
+
+
+def window_mask(start_index: int, end_index: int) -> int:
+    """Bits for slots in [start_index, end_index)."""
+    start_index = max(start_index, 0)
+    end_index = min(end_index, SLOTS_PER_DAY)
+    if end_index <= start_index:
+        return 0
+    return ((1 << (end_index - start_index)) - 1) << start_index
+
+
+WORKING_HOURS_MASK = window_mask(parse_slot_time(SLOT_DAY_START), parse_slot_time(SLOT_DAY_END))
+
+
+def decode_day(value) -> int:
+    """Bitmap for one day of slots_booked, accepting a list of time strings or a bitmap."""
+    if isinstance(value, int):
+        return value & DAY_MASK
+    bitmap = 0
+    for slot_time in value or []:
+        try:
+            bitmap |= slot_mask(parse_slot_time(slot_time))
+        except ValueError:
+            continue
+    return bitmap
+
+
+def bitmap_times(bitmap: int) -> list:
+    """Slot time strings for the set bits of a day bitmap."""
+    times = []
+    while bitmap:
+        # Jump straight to the lowest set bit instead of testing every slot
+        lowest = bitmap & -bitmap
+        times.append(_SLOT_LABELS[lowest.bit_length() - 1])
+        bitmap ^= lowest
+    return times
+
+
+def encode_day(slot_times: list) -> int:
+    """Bitmap for a list of slot time strings, raising ValueError on an unparseable time."""
+    bitmap = 0
+    for slot_time in slot_times:
+        bitmap |= slot_mask(parse_slot_time(slot_time))
+    return bitmap
+
+
+def decode_slots(slots_booked: dict | None) -> dict:
+    """Expand a stored slots_booked map to {slot_date: [slot_time, ...]} for API responses."""
+    decoded = {}
+    for slot_date, value in (slots_booked or {}).items():
+        times = bitmap_times(decode_day(value))
+        if times:
+            decoded[slot_date] = times
+    return decoded
+
+
+def is_past(slot_date: str, today: date = None) -> bool:
+    """True for dates before today; unparseable dates are kept."""
+    try:
+        return parse_slot_date(slot_date) < (today or date.today())
+    except ValueError:
+        return False
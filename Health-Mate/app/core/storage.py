@@ -0,0 +1,78 @@
+import asyncio
+import os
+import shutil
+import uuid
+import cloudinary.uploader
+from fastapi import UploadFile
+
+# File storage backends
+# The SDK calls are blocking, so every upload runs in a worker thread and
+# streams the spooled UploadFile in chunks instead of reading it into memory.
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "cloudinary")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "uploads")
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "/uploads")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(6 * 1024 * 1024)))
+MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", "4"))
+
+
+class CloudinaryStorage:
+    """Uploads to Cloudinary using the chunked upload API."""
+
+    def upload(self, fileobj, folder: str, filename: str | None = None) -> str:
+        result = cloudinary.uploader.upload_large(
+            fileobj,
+            folder=folder,
+            resource_type="auto",
+            chunk_size=UPLOAD_CHUNK_SIZE
+        )
+        return result.get("secure_url", "")
+
+
+class LocalStorage:
+    """Writes uploads to the local filesystem (stand-in for development and tests)."""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def upload(self, fileobj, folder: str, filename: str | None = None) -> str:
+        _, ext = os.path.splitext(os.path.basename(filename or ""))
+        name = f"{uuid.uuid4().hex}{ext}"
+
+        dest_dir = os.path.join(self.root, folder)
+        os.makedirs(dest_dir, exist_ok=True)
+
+        with open(os.path.join(dest_dir, name), "wb") as out:
+            shutil.copyfileobj(fileobj, out, UPLOAD_CHUNK_SIZE)
+
+        return f"{self.base_url}/{folder}/{name}"
+
+
+_storage = None
+_upload_slots: asyncio.Semaphore = None
+
+
+def get_storage():
+    """Get the configured storage backend."""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "local":
+            _storage = LocalStorage(LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL)
+        else:
+            _storage = CloudinaryStorage()
+    return _storage
+
+
+def _get_upload_slots() -> asyncio.Semaphore:
+    global _upload_slots
+    if _upload_slots is None:
+        _upload_slots = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+    return _upload_slots
+
+
+async def upload_file(file: UploadFile, folder: str) -> str:
+    """Upload an UploadFile off the event loop and return its public URL."""
+    async with _get_upload_slots():
+        await file.seek(0)
+        return await asyncio.to_thread(get_storage().upload, file.file, folder, file.filename)
@@ -1,14 +1,44 @@
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from typing import Optional
+from typing import Any, Optional
+import hashlib
+import os
+import time
 from ..core.config import settings
 from ..core.security import verify_token, verify_admin_token
-from ..core import redis as redis_module
+from ..core.cache import TTLCache
+from ..core.sessions import SESSION_ENFORCEMENT, is_session_valid
 
 # Custom header-based auth (to match Express.js headers)
 security = HTTPBearer(auto_error=False)
 
+# Recently verified tokens, keyed by token hash, so repeat requests from the
+# same session skip signature verification. Entries never outlive the token's exp.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+_verified_tokens = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+
+def decode_token(token: str) -> Any:
+    """Decode and verify a JWT, reusing a cached result when the same token was seen recently."""
+    key = hashlib.sha256(token.encode()).digest()
+    
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        return payload
+    
+    payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    
+    ttl = TOKEN_CACHE_TTL
+    if isinstance(payload, dict) and "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _verified_tokens.set(key, payload, ttl=ttl)
+    
+    return payload
+
 
 async def get_current_user(request: Request) -> str:
     """
@@ -24,7 +54,7 @@ async def get_current_user(request: Request) -> str:
         )
     
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_token(token)
         user_id: str = payload.get("id")
         if user_id is None:
             raise HTTPException(
@@ -32,11 +62,11 @@ async def get_current_user(request: Request) -> str:
                 detail={"success": False, "message": "Not Authorized Login Again"}
             )
         
-        # Optional: Check Redis session
-        if redis_module.redis_client:
-            is_valid = await redis_module.is_token_valid(user_id, token)
-            if not is_valid:
-                pass  # For now, allow even if not in Redis
+        if SESSION_ENFORCEMENT and not await is_session_valid(user_id, token):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail={"success": False, "message": "Session expired Login Again"}
+            )
         
         return user_id
     except JWTError as e:
@@ -63,13 +93,18 @@ async def get_current_doctor(request: Request) -> str:
     token = auth_header.split(" ")[1] if auth_header.startswith("Bearer ") else auth_header
     
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_token(token)
         doctor_id: str = payload.get("id")
         if doctor_id is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={"success": False, "message": "Invalid or expired token"}
             )
+        if SESSION_ENFORCEMENT and not await is_session_valid(doctor_id, token):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail={"success": False, "message": "Invalid or expired token"}
+            )
         return doctor_id
     except JWTError:
         raise HTTPException(
@@ -94,7 +129,7 @@ async def get_current_admin(request: Request) -> bool:
     try:
         # Express.js admin auth: jwt.sign(email + password, secret)
         # Then verifies: decoded === email + password
-        decoded = jwt.decode(atoken, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        decoded = decode_token(atoken)
         expected = settings.ADMIN_EMAIL + settings.ADMIN_PASSWORD
         
         if decoded != expected:
@@ -1,6 +1,20 @@
+import asyncio
 import logging
 from fastapi import FastAPI
-from app.core.database import connect_to_mongo,close_mongo_connection
+from fastapi.responses import PlainTextResponse
+from fastapi.staticfiles import StaticFiles
+from app.core.database import connect_to_mongo,close_mongo_connection,get_pool_stats as get_mongo_pool_stats
+from app.core.indexes import ensure_indexes
+from app.core.redis import connect_to_redis, close_redis_connection, get_pool_stats as get_redis_pool_stats
+from app.core.sessions import start_session_tracking, stop_session_tracking, get_session_stats
+from app.core.counters import run_reconciliation_loop
+from app.services.availability_services import run_availability_rebuild_loop
+from app.services.slot_services import run_slot_pruning_loop
+from app.services.search_services import run_search_rebuild_loop
+from app.core.security import shutdown_hashing_executor, get_hash_stats
+from app.core.metrics import registry
+from app.core.responses import FastJSONResponse
+from app.core.storage import STORAGE_BACKEND, LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL
 from app.routes.user_routes import router as user_router
 from app.routes.doctor_routes import router as doctor_router
 
@@ -11,22 +25,64 @@ logging.basicConfig(
 #creating the instance of fastapi
 app=FastAPI(
      title="Health Mate API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # Register the every routes
 app.inlcude_router(user_router,prefix="/api/v1")
 app.inlcude_router(doctor_router,prefix="/api/v1")
 
+# Serve files written by the local storage stand-in
+if STORAGE_BACKEND == "local":
+    app.mount(LOCAL_STORAGE_URL, StaticFiles(directory=LOCAL_STORAGE_DIR, check_dir=False), name="uploads")
+
  
 # connecting to mongodb when the server starts
 @app.on_event("startup")
 async def startup_event():
     await connect_to_mongo()
+    # build indexes in the background so startup is not blocked on large collections
+    app.state.index_task = asyncio.create_task(ensure_indexes())
+    await connect_to_redis()
+    start_session_tracking()
+    app.state.counter_task = asyncio.create_task(run_reconciliation_loop())
+    app.state.availability_task = asyncio.create_task(run_availability_rebuild_loop())
+    app.state.prune_task = asyncio.create_task(run_slot_pruning_loop())
+    app.state.search_task = asyncio.create_task(run_search_rebuild_loop())
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    app.state.counter_task.cancel()
+    app.state.availability_task.cancel()
+    app.state.prune_task.cancel()
+    app.state.search_task.cancel()
+    await stop_session_tracking()
+    await close_redis_connection()
     await close_mongo_connection()
+    shutdown_hashing_executor()
+
+
+# Export stats owned by other modules alongside the request metrics
+def collect_runtime_stats():
+    sources = {
+        "bcrypt_pool": get_hash_stats(),
+        "mongo_pool": get_mongo_pool_stats(),
+        "redis_pool": get_redis_pool_stats() or {},
+        "sessions": get_session_stats(),
+    }
+    for prefix, stats in sources.items():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{prefix}_{key}", "gauge", f"{prefix.replace('_', ' ')} {key.replace('_', ' ')}", value
+
+registry.register_collector(collect_runtime_stats)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # 
 @app.get("/")
 def server():
@@ -1,5 +1,13 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+# Appointments embed only a small snapshot of the user and doctor;
+# listings hydrate the remaining display fields from the source documents.
+USER_SNAPSHOT_FIELDS = ("name", "image", "dob")
+DOCTOR_SNAPSHOT_FIELDS = ("name", "image", "speciality")
+
+USER_DISPLAY_FIELDS = ("name", "email", "image", "phone", "dob", "gender")
+DOCTOR_DISPLAY_FIELDS = ("name", "image", "speciality", "degree", "experience", "fees", "address")
 
 
 class AppointmentBase(BaseModel):
@@ -51,6 +59,10 @@ class AppointmentCancel(BaseModel):
     appointmentId: str
 
 
+class AppointmentBulkAction(BaseModel):
+    appointmentIds: List[str] = Field(..., min_length=1, max_length=500)
+
+
 class PaymentRequest(BaseModel):
     appointmentId: str
 
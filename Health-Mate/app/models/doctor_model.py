@@ -5,6 +5,8 @@ from typing import Optional, Dict, Any
 class DoctorAddress(BaseModel):
     line1: str = ""
     line2: str = ""
+    lat: Optional[float] = None
+    lng: Optional[float] = None
 
 
 class DoctorBase(BaseModel):
@@ -18,7 +20,7 @@ class DoctorBase(BaseModel):
     available: bool = True
     fees: float
     slots_booked: Dict[str, Any] = Field(default_factory=dict)
-    address: Dict[str, str] = Field(default_factory=dict)
+    address: Dict[str, Any] = Field(default_factory=dict)
     date: int
 
 
@@ -41,7 +43,7 @@ class DoctorLogin(BaseModel):
 
 class DoctorUpdate(BaseModel):
     fees: Optional[float] = None
-    address: Optional[Dict[str, str]] = None
+    address: Optional[Dict[str, Any]] = None
     available: Optional[bool] = None
     about: Optional[str] = None
 
@@ -66,7 +68,7 @@ class DoctorResponse(BaseModel):
     available: bool
     fees: float
     slots_booked: Dict[str, Any] = Field(default_factory=dict)
-    address: Dict[str, str]
+    address: Dict[str, Any]
     date: int
     
     class Config:
@@ -84,7 +86,7 @@ class DoctorPublicResponse(BaseModel):
     about: str
     available: bool
     fees: float
-    address: Dict[str, str]
+    address: Dict[str, Any]
     
     class Config:
         populate_by_name = True
@@ -0,0 +1,7 @@
+from typing import Dict, Type
+from pydantic import BaseModel
+
+
+def model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """Build a Mongo projection selecting only the fields a response model declares."""
+    return {field.alias or name: 1 for name, field in model.model_fields.items()}
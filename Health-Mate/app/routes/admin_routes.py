@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, Body
-from typing import Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, UploadFile, File, Form, Body, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from pydantic import BaseModel, Field
 from ..dependencies.auth import get_current_admin
+from ..core.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from ..core.metrics import MetricsRoute
+from ..core.responses import FastJSONResponse
+from ..services.export_services import EXPORT_BATCH_SIZE
+from ..models.appointment_model import AppointmentBulkAction
 from ..services import admin_service, doctor_service
 
-router = APIRouter(prefix="/api/admin", tags=["Admin"])
+router = APIRouter(prefix="/api/admin", tags=["Admin"], route_class=MetricsRoute)
 
 
 class AdminLogin(BaseModel):
@@ -20,6 +26,16 @@ class ChangeAvailability(BaseModel):
     docId: str
 
 
+class SessionRevoke(BaseModel):
+    userIds: List[str] = Field(..., min_length=1, max_length=1000)
+
+
+class ProfilerSettings(BaseModel):
+    enabled: Optional[bool] = None
+    slowMs: Optional[float] = None
+    explainSampleRate: Optional[float] = None
+
+
 @router.post("/login")
 async def login(data: AdminLogin):
     """Login admin."""
@@ -41,10 +57,6 @@ async def add_doctor(
     _: bool = Depends(get_current_admin)
 ):
     """Add a new doctor."""
-    image_bytes = None
-    if image:
-        image_bytes = await image.read()
-    
     return await admin_service.add_doctor(
         name=name,
         email=email,
@@ -55,14 +67,21 @@ async def add_doctor(
         about=about,
         fees=fees,
         address=address,
-        image_bytes=image_bytes
+        image=image
     )
 
 
 @router.get("/all-doctors")
-async def get_all_doctors(_: bool = Depends(get_current_admin)):
+async def get_all_doctors(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fetch_all: bool = Query(False, alias="all"),
+    _: bool = Depends(get_current_admin)
+):
     """Get all doctors."""
-    return await admin_service.get_all_doctors_admin()
+    return FastJSONResponse(
+        await admin_service.get_all_doctors_admin(limit=limit, cursor=cursor, fetch_all=fetch_all)
+    )
 
 
 @router.post("/change-availability")
@@ -72,9 +91,39 @@ async def change_availability(data: ChangeAvailability, _: bool = Depends(get_cu
 
 
 @router.get("/appointments")
-async def get_appointments(_: bool = Depends(get_current_admin)):
+async def get_appointments(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fetch_all: bool = Query(False, alias="all"),
+    _: bool = Depends(get_current_admin)
+):
     """Get all appointments."""
-    return await admin_service.get_all_appointments_admin()
+    return FastJSONResponse(
+        await admin_service.get_all_appointments_admin(limit=limit, cursor=cursor, fetch_all=fetch_all)
+    )
+
+
+@router.get("/appointments/export")
+async def export_appointments(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    doc_id: Optional[str] = Query(None, alias="docId"),
+    start: Optional[str] = Query(None, description="First booking date, YYYY-MM-DD"),
+    end: Optional[str] = Query(None, description="Last booking date, YYYY-MM-DD"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=100, le=10000),
+    _: bool = Depends(get_current_admin)
+):
+    """Stream appointments as NDJSON or CSV."""
+    result = await admin_service.export_appointments_admin(
+        fmt=fmt, doc_id=doc_id, start=start, end=end, batch_size=batch_size
+    )
+    if not result["success"]:
+        return result
+    
+    return StreamingResponse(
+        result["stream"],
+        media_type=result["media_type"],
+        headers={"Content-Disposition": f'attachment; filename="appointments.{fmt}"'}
+    )
 
 
 @router.post("/cancel-appointment")
@@ -83,7 +132,71 @@ async def cancel_appointment(data: AppointmentCancel, _: bool = Depends(get_curr
     return await admin_service.cancel_appointment_admin(data.appointmentId)
 
 
+@router.post("/cancel-appointments")
+async def cancel_appointments(data: AppointmentBulkAction, _: bool = Depends(get_current_admin)):
+    """Cancel several appointments."""
+    return await admin_service.cancel_appointments_admin(data.appointmentIds)
+
+
 @router.get("/dashboard")
 async def get_dashboard(_: bool = Depends(get_current_admin)):
     """Get admin dashboard data."""
     return await admin_service.get_admin_dashboard()
+
+
+@router.get("/hash-stats")
+async def get_hash_stats(_: bool = Depends(get_current_admin)):
+    """Get password hashing pool statistics."""
+    return await admin_service.get_hash_stats_admin()
+
+
+@router.get("/pool-stats")
+async def get_pool_stats(_: bool = Depends(get_current_admin)):
+    """Get database connection pool statistics."""
+    return await admin_service.get_pool_stats_admin()
+
+
+@router.post("/revoke-sessions")
+async def revoke_sessions(data: SessionRevoke, _: bool = Depends(get_current_admin)):
+    """Revoke every session of the given users or doctors."""
+    return await admin_service.revoke_sessions_admin(data.userIds)
+
+
+@router.get("/session-stats")
+async def get_session_stats(_: bool = Depends(get_current_admin)):
+    """Get session check and cache statistics."""
+    return await admin_service.get_session_stats_admin()
+
+
+@router.get("/singleflight-stats")
+async def get_singleflight_stats(_: bool = Depends(get_current_admin)):
+    """Get request coalescing statistics."""
+    return await admin_service.get_singleflight_stats_admin()
+
+
+@router.get("/profiler")
+async def get_profiler(_: bool = Depends(get_current_admin)):
+    """Get query profiler settings and recent slow queries."""
+    return await admin_service.get_profiler_admin()
+
+
+@router.post("/profiler")
+async def update_profiler(data: ProfilerSettings, _: bool = Depends(get_current_admin)):
+    """Change query profiler settings."""
+    return await admin_service.update_profiler_admin(
+        enabled=data.enabled,
+        slow_ms=data.slowMs,
+        explain_sample_rate=data.explainSampleRate
+    )
+
+
+@router.get("/indexes")
+async def get_indexes(_: bool = Depends(get_current_admin)):
+    """Get index health report."""
+    return await admin_service.get_index_report_admin()
+
+
+@router.post("/reconcile-counters")
+async def reconcile_counters(_: bool = Depends(get_current_admin)):
+    """Recompute dashboard counters."""
+    return await admin_service.reconcile_counters_admin()
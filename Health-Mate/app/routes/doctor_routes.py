@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, Query, Request, Response
+from typing import Optional
 from ..dependencies.auth import get_current_doctor
+from ..core.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from ..core.metrics import MetricsRoute
+from ..core.responses import FastJSONResponse
+from ..services.directory_cache import etag_matches
 from ..services import doctor_service
 from ..models.doctor_model import DoctorLogin, DoctorUpdate
-from ..models.appointment_model import AppointmentCancel
+from ..models.appointment_model import AppointmentCancel, AppointmentBulkAction
 
-router = APIRouter(prefix="/api/doctor", tags=["Doctor"])
+router = APIRouter(prefix="/api/doctor", tags=["Doctor"], route_class=MetricsRoute)
 
 
 @router.post("/login")
@@ -14,15 +19,80 @@ async def login(doctor: DoctorLogin):
 
 
 @router.get("/list")
-async def list_doctors():
+async def list_doctors(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fetch_all: bool = Query(False, alias="all")
+):
     """Get list of all doctors (public)."""
-    return await doctor_service.get_all_doctors()
+    body, etag = await doctor_service.get_doctor_directory(limit=limit, cursor=cursor, fetch_all=fetch_all)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/search")
+async def search_doctors(
+    q: Optional[str] = Query(None, description="Text to match against name, speciality, degree and about"),
+    speciality: Optional[str] = None,
+    degree: Optional[str] = None,
+    min_fee: Optional[float] = Query(None, ge=0),
+    max_fee: Optional[float] = Query(None, ge=0),
+    available: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Search doctors with facet filters and counts (public)."""
+    return FastJSONResponse(await doctor_service.search_directory(
+        q=q, speciality=speciality, degree=degree, min_fee=min_fee, max_fee=max_fee, available=available, limit=limit
+    ))
+
+
+@router.get("/nearby")
+async def nearby_doctors(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    place: Optional[str] = Query(None, description="Place name to search around when lat/lng are not given"),
+    max_km: float = Query(10, gt=0, le=500),
+    speciality: Optional[str] = None,
+    available: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Find doctors near a location (public)."""
+    return FastJSONResponse(await doctor_service.get_nearby_doctors(
+        lat=lat, lng=lng, place=place, max_km=max_km, speciality=speciality, available=available, limit=limit
+    ))
+
+
+@router.get("/availability")
+async def search_availability(
+    speciality: Optional[str] = None,
+    start: Optional[str] = Query(None, description="First date, YYYY-MM-DD (default today)"),
+    end: Optional[str] = Query(None, description="Last date, YYYY-MM-DD (default start + 6 days)"),
+    from_time: Optional[str] = Query(None, description="Earliest slot time, e.g. 10:00 or 10:00 AM"),
+    to_time: Optional[str] = Query(None, description="Slots must start before this time"),
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT)
+):
+    """Find doctors with free slots (public)."""
+    return FastJSONResponse(await doctor_service.search_availability(
+        speciality=speciality, start=start, end=end, from_time=from_time, to_time=to_time, limit=limit
+    ))
 
 
 @router.get("/appointments")
-async def get_appointments(doc_id: str = Depends(get_current_doctor)):
+async def get_appointments(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fetch_all: bool = Query(False, alias="all"),
+    doc_id: str = Depends(get_current_doctor)
+):
     """Get doctor's appointments."""
-    return await doctor_service.get_doctor_appointments(doc_id)
+    return FastJSONResponse(
+        await doctor_service.get_doctor_appointments(doc_id, limit=limit, cursor=cursor, fetch_all=fetch_all)
+    )
 
 
 @router.post("/cancel-appointment")
@@ -37,6 +107,18 @@ async def complete_appointment(data: AppointmentCancel, doc_id: str = Depends(ge
     return await doctor_service.complete_doctor_appointment(doc_id, data.appointmentId)
 
 
+@router.post("/cancel-appointments")
+async def cancel_appointments(data: AppointmentBulkAction, doc_id: str = Depends(get_current_doctor)):
+    """Cancel several appointments."""
+    return await doctor_service.cancel_doctor_appointments(doc_id, data.appointmentIds)
+
+
+@router.post("/complete-appointments")
+async def complete_appointments(data: AppointmentBulkAction, doc_id: str = Depends(get_current_doctor)):
+    """Mark several appointments as completed."""
+    return await doctor_service.complete_doctor_appointments(doc_id, data.appointmentIds)
+
+
 @router.post("/change-availability")
 async def change_availability(doc_id: str = Depends(get_current_doctor)):
     """Toggle doctor availability."""
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, Query
+from typing import Optional
 from app.schemas.user_schema import (
     UserRegister,
     UserLogin,
     UserUpdate
 )
+from app.core.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from app.core.metrics import MetricsRoute
+from app.core.responses import FastJSONResponse
 from app.services.user_service import (
     register_user,
     login_user,
@@ -15,7 +19,7 @@ from app.services.user_service import (
     list_appointments
 )
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=MetricsRoute)
 
 @router.post("/register")
 async def register(user: UserRegister):
@@ -55,5 +59,12 @@ async def cancel(data: dict):
 
 
 @router.get("/appointments/{user_id}")
-async def appointments(user_id: str):
-    return await list_appointments(user_id)
+async def appointments(
+    user_id: str,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fetch_all: bool = Query(False, alias="all")
+):
+    return FastJSONResponse(
+        await list_appointments(user_id, limit=limit, cursor=cursor, fetch_all=fetch_all)
+    )
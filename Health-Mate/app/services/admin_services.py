@@ -1,15 +1,38 @@
 from email_validator import validate_email, EmailNotValidError
+from fastapi import UploadFile
 from bson import ObjectId
 from jose import jwt
+import asyncio
 import json
 import time
 
 from ..core.config import settings
 from ..core.database import get_doctors_collection, get_appointments_collection, get_users_collection
-from ..core.security import get_password_hash
-from ..core.cloudinary_config import upload_image_from_bytes
+from ..core.pagination import paginate, InvalidCursorError
+from ..core.indexes import get_index_report
+from ..core import database
+from ..core.mongo_monitoring import command_profiler
+from ..core import redis as redis_module
+from ..core.counters import record_cancellation, record_doctor_added, get_global_counters, reconcile_counters
+from ..core.security import hash_password_async, get_hash_stats
+from ..core.storage import upload_file
+from ..core.geocoding import address_location
+from .slot_services import release_slot
+from .appointment_services import hydrate_appointments, parse_object_ids, bulk_cancel_appointments
+from .directory_cache import invalidate_directory
+from .availability_services import refresh_doctor_availability
+from .search_services import refresh_doctor_search
+from .export_services import EXPORT_BATCH_SIZE, EXPORT_FORMATS, build_export_query, stream_appointments
+from .doctor_services import DOCTOR_PROJECTION, toggle_availability
+from ..core.metrics import timed
+from ..core.singleflight import get_singleflight_stats
+from ..core.sessions import SESSION_ENFORCEMENT, revoke_user_sessions, get_session_stats
+from ..core.slots import decode_slots
 
+DASHBOARD_LATEST_LIMIT = 5
 
+
+@timed
 async def login_admin(email: str, password: str) -> dict:
     """Login admin user."""
     if email == settings.ADMIN_EMAIL and password == settings.ADMIN_PASSWORD:
@@ -19,6 +42,7 @@ async def login_admin(email: str, password: str) -> dict:
     return {"success": False, "message": "Invalid credentials"}
 
 
+@timed
 async def add_doctor(
     name: str,
     email: str,
@@ -29,7 +53,7 @@ async def add_doctor(
     about: str,
     fees: float,
     address: str,
-    image_bytes: bytes = None
+    image: UploadFile = None
 ) -> dict:
     """Add a new doctor."""
     doctors = get_doctors_collection()
@@ -49,13 +73,13 @@ async def add_doctor(
         return {"success": False, "message": "Please enter a strong password"}
     
     # Hash password
-    hashed_password = get_password_hash(password)
+    hashed_password = await hash_password_async(password)
     
     # Upload image if provided
     image_url = ""
-    if image_bytes:
+    if image:
         try:
-            image_url = await upload_image_from_bytes(image_bytes, "doctor")
+            image_url = await upload_file(image, "doctor")
         except Exception as e:
             return {"success": False, "message": f"Image upload failed: {str(e)}"}
     
@@ -63,6 +87,9 @@ async def add_doctor(
     try:
         address_dict = json.loads(address)
     except json.JSONDecodeError:
+        address_dict = None
+    # Valid JSON that is not an object ("123", a list) is a plain address line too
+    if not isinstance(address_dict, dict):
         address_dict = {"line1": address, "line2": ""}
     
     doctor_data = {
@@ -81,121 +108,251 @@ async def add_doctor(
         "date": int(time.time() * 1000)
     }
     
-    await doctors.insert_one(doctor_data)
+    location = address_location(address_dict)
+    if location:
+        doctor_data["location"] = location
+    
+    result = await doctors.insert_one(doctor_data)
+    await record_doctor_added()
+    await invalidate_directory()
+    await refresh_doctor_availability(str(result.inserted_id))
+    await refresh_doctor_search(str(result.inserted_id))
     
     return {"success": True, "message": "Doctor Added"}
 
 
-async def get_all_doctors_admin() -> dict:
+@timed
+async def get_all_doctors_admin(limit: int = None, cursor: str = None, fetch_all: bool = False) -> dict:
     """Get all doctors (admin view with all fields except password)."""
     doctors = get_doctors_collection()
     
-    cursor = doctors.find({})
-    docs = []
-    async for doc in cursor:
+    if fetch_all:
+        cursor_docs = doctors.find({}, DOCTOR_PROJECTION)
+        docs = []
+        async for doc in cursor_docs:
+            doc["_id"] = str(doc["_id"])
+            doc["slots_booked"] = decode_slots(doc.get("slots_booked"))
+            docs.append(doc)
+        
+        return {"success": True, "doctors": docs}
+    
+    try:
+        docs, next_cursor = await paginate(
+            doctors, {}, limit=limit, cursor=cursor, projection=DOCTOR_PROJECTION
+        )
+    except InvalidCursorError:
+        return {"success": False, "message": "Invalid cursor"}
+    
+    for doc in docs:
         doc["_id"] = str(doc["_id"])
-        doc.pop("password", None)
-        docs.append(doc)
+        doc["slots_booked"] = decode_slots(doc.get("slots_booked"))
     
-    return {"success": True, "doctors": docs}
+    return {"success": True, "doctors": docs, "next_cursor": next_cursor}
 
 
-async def get_all_appointments_admin() -> dict:
+@timed
+async def get_all_appointments_admin(limit: int = None, cursor: str = None, fetch_all: bool = False) -> dict:
     """Get all appointments for admin."""
     appointments = get_appointments_collection()
     
-    cursor = appointments.find({})
-    appts = []
-    async for appt in cursor:
+    if fetch_all:
+        cursor_appts = appointments.find({})
+        appts = []
+        async for appt in cursor_appts:
+            appt["_id"] = str(appt["_id"])
+            appts.append(appt)
+        
+        await hydrate_appointments(appts)
+        return {"success": True, "appointments": appts}
+    
+    try:
+        appts, next_cursor = await paginate(
+            appointments, {}, limit=limit, cursor=cursor, sort_field="date", direction=-1
+        )
+    except InvalidCursorError:
+        return {"success": False, "message": "Invalid cursor"}
+    
+    for appt in appts:
         appt["_id"] = str(appt["_id"])
-        appts.append(appt)
     
-    return {"success": True, "appointments": appts}
+    await hydrate_appointments(appts)
+    return {"success": True, "appointments": appts, "next_cursor": next_cursor}
 
 
+async def export_appointments_admin(
+    fmt: str = "ndjson",
+    doc_id: str = None,
+    start: str = None,
+    end: str = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> dict:
+    """Prepare a streaming export of appointments; the rows are produced lazily by "stream"."""
+    if fmt not in EXPORT_FORMATS:
+        return {"success": False, "message": f"Unsupported format, expected one of {', '.join(EXPORT_FORMATS)}"}
+    
+    try:
+        query = build_export_query(doc_id=doc_id, start=start, end=end)
+    except ValueError:
+        return {"success": False, "message": "Invalid date, expected YYYY-MM-DD"}
+    
+    return {
+        "success": True,
+        "stream": stream_appointments(query, fmt, batch_size),
+        "media_type": EXPORT_FORMATS[fmt]
+    }
+
+
+@timed
 async def cancel_appointment_admin(appointment_id: str) -> dict:
     """Cancel any appointment (admin)."""
     appointments = get_appointments_collection()
-    doctors = get_doctors_collection()
     
     appt = await appointments.find_one({"_id": ObjectId(appointment_id)})
     if not appt:
         return {"success": False, "message": "Appointment not found"}
     
     # Cancel appointment
-    await appointments.update_one(
-        {"_id": ObjectId(appointment_id)},
+    result = await appointments.update_one(
+        {"_id": ObjectId(appointment_id), "cancelled": {"$ne": True}},
         {"$set": {"cancelled": True}}
     )
     
-    # Release doctor slot
-    doc_id = appt["docId"]
-    slot_date = appt["slotDate"]
-    slot_time = appt["slotTime"]
-    
-    doctor = await doctors.find_one({"_id": ObjectId(doc_id)})
-    if doctor:
-        slots_booked = doctor.get("slots_booked", {})
-        if slot_date in slots_booked and slot_time in slots_booked[slot_date]:
-            slots_booked[slot_date].remove(slot_time)
-            await doctors.update_one(
-                {"_id": ObjectId(doc_id)},
-                {"$set": {"slots_booked": slots_booked}}
-            )
+    # Release doctor slot (only once, so a rebooked slot is never freed)
+    if result.modified_count:
+        await release_slot(appt["docId"], appt["slotDate"], appt["slotTime"])
+        await record_cancellation(appt["docId"])
     
     return {"success": True, "message": "Appointment Cancelled"}
 
 
+@timed
+async def cancel_appointments_admin(appointment_ids: list) -> dict:
+    """Cancel several appointments at once (admin)."""
+    object_ids = parse_object_ids(appointment_ids)
+    if object_ids is None:
+        return {"success": False, "message": "Invalid appointment id"}
+    
+    cancelled, skipped = await bulk_cancel_appointments(object_ids)
+    
+    return {"success": True, "message": "Appointments Cancelled", "cancelled": cancelled, "skipped": skipped}
+
+
+@timed
 async def change_doctor_availability_admin(doc_id: str) -> dict:
     """Toggle doctor availability (admin)."""
-    doctors = get_doctors_collection()
-    
     if not doc_id:
         return {"success": False, "message": "Doctor ID missing"}
     
-    doctor = await doctors.find_one({"_id": ObjectId(doc_id)})
-    if not doctor:
+    available = await toggle_availability(doc_id)
+    if available is None:
         return {"success": False, "message": "Doctor not found"}
     
-    current_available = doctor.get("available", True)
-    await doctors.update_one(
-        {"_id": ObjectId(doc_id)},
-        {"$set": {"available": not current_available}}
-    )
+    return {"success": True, "message": "Availability changed successfully", "available": available}
+
+
+async def get_hash_stats_admin() -> dict:
+    """Get password hashing pool statistics."""
+    return {"success": True, "hashStats": get_hash_stats()}
+
+
+async def get_pool_stats_admin() -> dict:
+    """Get Mongo and Redis connection pool statistics."""
+    return {
+        "success": True,
+        "pools": {
+            "mongo": database.get_pool_stats(),
+            "redis": redis_module.get_pool_stats()
+        }
+    }
+
+
+@timed
+async def revoke_sessions_admin(user_ids: list) -> dict:
+    """Log users or doctors out of every device."""
+    if not redis_module.redis_client:
+        return {"success": False, "message": "Session store unavailable"}
+    # Without enforcement tokens are never checked against the store, so revoking would change nothing
+    if not SESSION_ENFORCEMENT:
+        return {"success": False, "message": "Session enforcement is disabled; set SESSION_ENFORCEMENT=true to revoke sessions"}
     
-    return {"success": True, "message": "Availability changed successfully"}
+    revoked = await revoke_user_sessions(user_ids)
+    return {"success": True, "message": f"Revoked sessions for {revoked} accounts", "revoked": revoked}
+
+
+async def get_session_stats_admin() -> dict:
+    """Session check and local cache statistics."""
+    return {"success": True, "stats": get_session_stats()}
+
+
+async def get_singleflight_stats_admin() -> dict:
+    """Calls and coalesced calls per single-flight wrapped service function."""
+    return {"success": True, "stats": get_singleflight_stats()}
+
 
+async def get_profiler_admin() -> dict:
+    """Get query profiler settings and recent slow queries."""
+    return {"success": True, "profiler": command_profiler.snapshot()}
 
+
+async def update_profiler_admin(enabled: bool = None, slow_ms: float = None, explain_sample_rate: float = None) -> dict:
+    """Change query profiler settings at runtime."""
+    if slow_ms is not None and slow_ms < 0:
+        return {"success": False, "message": "slowMs must not be negative"}
+    
+    command_profiler.configure(enabled=enabled, slow_ms=slow_ms, explain_sample_rate=explain_sample_rate)
+    return {"success": True, "message": "Profiler updated"}
+
+
+@timed
+async def get_index_report_admin() -> dict:
+    """Get missing and unused index report."""
+    return {"success": True, "indexes": await get_index_report()}
+
+
+@timed
+async def reconcile_counters_admin() -> dict:
+    """Recompute dashboard counters from the database."""
+    if not await reconcile_counters():
+        return {"success": False, "message": "Counters unavailable or already being reconciled"}
+    return {"success": True, "message": "Counters reconciled"}
+
+
+@timed
 async def get_admin_dashboard() -> dict:
     """Get admin dashboard data."""
     doctors = get_doctors_collection()
     users = get_users_collection()
     appointments = get_appointments_collection()
     
-    # Count doctors
-    docs_cursor = doctors.find({})
-    docs = []
-    async for doc in docs_cursor:
-        docs.append(doc)
-    
-    # Count users  
-    users_cursor = users.find({})
-    user_list = []
-    async for user in users_cursor:
-        user_list.append(user)
-    
-    # Get appointments
-    appts_cursor = appointments.find({})
-    appts = []
-    async for appt in appts_cursor:
+    # Counts come from the maintained counters (or collection metadata as a
+    # fallback) and only the latest appointments are fetched, so the cost no
+    # longer grows with the size of the database
+    latest_cursor = appointments.find({}).sort("date", -1).limit(DASHBOARD_LATEST_LIMIT)
+    counters, latest = await asyncio.gather(
+        get_global_counters(),
+        latest_cursor.to_list(length=DASHBOARD_LATEST_LIMIT)
+    )
+    
+    if counters:
+        doctor_count = counters["doctors"]
+        patient_count = counters["patients"]
+        appointment_count = counters["appointments"]
+    else:
+        doctor_count, patient_count, appointment_count = await asyncio.gather(
+            doctors.estimated_document_count(),
+            users.estimated_document_count(),
+            appointments.estimated_document_count()
+        )
+    
+    for appt in latest:
         appt["_id"] = str(appt["_id"])
-        appts.append(appt)
+    await hydrate_appointments(latest)
     
     dash_data = {
-        "doctors": len(docs),
-        "appointments": len(appts),
-        "patients": len(user_list),
-        "latestAppointments": list(reversed(appts))[:5]
+        "doctors": doctor_count,
+        "appointments": appointment_count,
+        "patients": patient_count,
+        "latestAppointments": latest
     }
     
     return {"success": True, "dashData": dash_data}
@@ -0,0 +1,135 @@
+from collections import Counter
+from uuid import uuid4
+from bson import ObjectId
+from bson.errors import InvalidId
+from ..core.cache import TTLCache
+from ..core.counters import record_cancellations
+from ..core.database import get_users_collection, get_doctors_collection, get_appointments_collection
+from .slot_services import release_slots
+from ..models.appointment_model import (
+    USER_SNAPSHOT_FIELDS,
+    DOCTOR_SNAPSHOT_FIELDS,
+    USER_DISPLAY_FIELDS,
+    DOCTOR_DISPLAY_FIELDS,
+)
+
+# Batched hydration of appointment listings
+# One $in query per collection per page, with recently seen profiles cached.
+
+HYDRATION_BATCH_SIZE = 1000
+
+_user_cache = TTLCache(maxsize=10000, ttl=60)
+_doctor_cache = TTLCache(maxsize=5000, ttl=60)
+
+
+def user_snapshot(user: dict | None) -> dict:
+    """Small user snapshot stored on an appointment."""
+    if not user:
+        return {}
+    return {field: user[field] for field in USER_SNAPSHOT_FIELDS if field in user}
+
+
+def doctor_snapshot(doctor: dict | None) -> dict:
+    """Small doctor snapshot stored on an appointment."""
+    if not doctor:
+        return {}
+    return {field: doctor[field] for field in DOCTOR_SNAPSHOT_FIELDS if field in doctor}
+
+
+def invalidate_user(user_id: str):
+    _user_cache.pop(user_id)
+
+
+def invalidate_doctor(doc_id: str):
+    _doctor_cache.pop(doc_id)
+
+
+async def _load_profiles(collection, ids: set, fields: tuple, cache: TTLCache) -> dict:
+    profiles = {}
+    missing = []
+
+    for id_ in ids:
+        cached = cache.get(id_)
+        if cached is not None:
+            profiles[id_] = cached
+            continue
+        try:
+            missing.append(ObjectId(id_))
+        except (InvalidId, TypeError):
+            continue
+
+    projection = {field: 1 for field in fields}
+
+    for start in range(0, len(missing), HYDRATION_BATCH_SIZE):
+        batch = missing[start:start + HYDRATION_BATCH_SIZE]
+        async for doc in collection.find({"_id": {"$in": batch}}, projection):
+            id_ = str(doc.pop("_id"))
+            cache.set(id_, doc)
+            profiles[id_] = doc
+
+    return profiles
+
+
+async def hydrate_appointments(appts: list, users: bool = True, doctors: bool = True) -> list:
+    """Fill userData/docData display fields on a page of appointments in place."""
+    if not appts:
+        return appts
+
+    user_profiles = {}
+    doctor_profiles = {}
+
+    if users:
+        user_ids = {appt.get("userId") for appt in appts if appt.get("userId")}
+        user_profiles = await _load_profiles(
+            get_users_collection(), user_ids, USER_DISPLAY_FIELDS, _user_cache
+        )
+    if doctors:
+        doc_ids = {appt.get("docId") for appt in appts if appt.get("docId")}
+        doctor_profiles = await _load_profiles(
+            get_doctors_collection(), doc_ids, DOCTOR_DISPLAY_FIELDS, _doctor_cache
+        )
+
+    for appt in appts:
+        # Fall back to the stored snapshot when the source document is gone
+        if users and appt.get("userId") in user_profiles:
+            appt["userData"] = {**(appt.get("userData") or {}), **user_profiles[appt["userId"]]}
+        if doctors and appt.get("docId") in doctor_profiles:
+            appt["docData"] = {**(appt.get("docData") or {}), **doctor_profiles[appt["docId"]]}
+
+    return appts
+
+
+def parse_object_ids(ids: list) -> list | None:
+    """Convert appointment ids to ObjectIds, or None if any is malformed."""
+    try:
+        return [ObjectId(id_) for id_ in ids]
+    except (InvalidId, TypeError):
+        return None
+
+
+async def bulk_cancel_appointments(object_ids: list, scope: dict = None) -> tuple[int, int]:
+    """
+    Cancel many appointments and release their slots in one pass.
+    scope narrows which appointments may be touched (e.g. {"docId": ...}).
+    Returns (cancelled, skipped).
+    """
+    appointments = get_appointments_collection()
+
+    # Rows this call cancels are tagged with a batch token, so slots are released
+    # and counted only for them, never for rows a concurrent cancel got to first
+    batch = uuid4().hex
+    result = await appointments.update_many(
+        {"_id": {"$in": object_ids}, "cancelled": {"$ne": True}, **(scope or {})},
+        {"$set": {"cancelled": True, "cancelBatch": batch}}
+    )
+    if not result.modified_count:
+        return 0, len(object_ids)
+
+    cancelled = await appointments.find(
+        {"_id": {"$in": object_ids}, "cancelBatch": batch}, {"docId": 1, "slotDate": 1, "slotTime": 1}
+    ).to_list(length=None)
+
+    await release_slots([(appt["docId"], appt["slotDate"], appt["slotTime"]) for appt in cancelled])
+    await record_cancellations(Counter(appt["docId"] for appt in cancelled))
+
+    return len(cancelled), len(object_ids) - len(cancelled)
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta
+from bson import ObjectId
+from ..core.database import get_doctors_collection
+from ..core.slots import (
+    SLOTS_PER_DAY,
+    DAY_MASK,
+    SLOT_MINUTES,
+    WORKING_HOURS_MASK,
+    parse_slot_date,
+    parse_slot_time,
+    format_slot_date,
+    slot_mask,
+    window_mask,
+    decode_day,
+    bitmap_times,
+)
+
+# Free-slot search index
+# Each doctor's bookings over the next HORIZON_DAYS are packed into one integer,
+# day d occupying bits [d * SLOTS_PER_DAY, (d + 1) * SLOTS_PER_DAY). A search
+# builds one mask for the requested dates and time window, so checking a
+# doctor is a single AND-NOT on that integer instead of walking nested dicts.
+
+HORIZON_DAYS = int(os.getenv("AVAILABILITY_HORIZON_DAYS", "90"))
+REBUILD_INTERVAL = int(os.getenv("AVAILABILITY_REBUILD_INTERVAL", "300"))
+
+INDEX_PROJECTION = {"name": 1, "image": 1, "speciality": 1, "fees": 1, "available": 1, "slots_booked": 1}
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self.base = date.today()
+        self.doctors = {}
+        self.by_speciality = {}
+
+    def _roll(self):
+        # Drop days that have passed by shifting every bitmap down
+        today = date.today()
+        shift = (today - self.base).days
+        if shift <= 0:
+            return
+        for entry in self.doctors.values():
+            entry["booked"] >>= shift * SLOTS_PER_DAY
+        self.base = today
+
+    def _offset(self, day: date) -> int | None:
+        offset = (day - self.base).days
+        if 0 <= offset < HORIZON_DAYS:
+            return offset
+        return None
+
+    def set_doctor(self, doctor: dict):
+        self._roll()
+        doc_id = str(doctor["_id"])
+        self.remove_doctor(doc_id)
+
+        booked = 0
+        for slot_date, value in (doctor.get("slots_booked") or {}).items():
+            try:
+                offset = self._offset(parse_slot_date(slot_date))
+            except ValueError:
+                continue
+            if offset is not None:
+                booked |= decode_day(value) << (offset * SLOTS_PER_DAY)
+
+        speciality = doctor.get("speciality", "")
+        self.doctors[doc_id] = {
+            "info": {
+                "_id": doc_id,
+                "name": doctor.get("name"),
+                "image": doctor.get("image"),
+                "speciality": speciality,
+                "fees": doctor.get("fees"),
+            },
+            "available": doctor.get("available", True),
+            "speciality": speciality,
+            "booked": booked,
+        }
+        self.by_speciality.setdefault(speciality, set()).add(doc_id)
+
+    def remove_doctor(self, doc_id: str):
+        entry = self.doctors.pop(doc_id, None)
+        if entry:
+            self.by_speciality.get(entry["speciality"], set()).discard(doc_id)
+
+    def _bit(self, slot_date: str, slot_time: str) -> int | None:
+        try:
+            offset = self._offset(parse_slot_date(slot_date))
+            index = parse_slot_time(slot_time)
+        except ValueError:
+            return None
+        if offset is None:
+            return None
+        return slot_mask(index) << (offset * SLOTS_PER_DAY)
+
+    def book(self, doc_id: str, slot_date: str, slot_time: str):
+        self._roll()
+        entry = self.doctors.get(doc_id)
+        bit = self._bit(slot_date, slot_time)
+        if entry and bit:
+            entry["booked"] |= bit
+
+    def release(self, doc_id: str, slot_date: str, slot_time: str):
+        self._roll()
+        entry = self.doctors.get(doc_id)
+        bit = self._bit(slot_date, slot_time)
+        if entry and bit:
+            entry["booked"] &= ~bit
+
+    def search(self, speciality: str | None, start: date, end: date, day_window: int, limit: int) -> list:
+        self._roll()
+
+        first = max((start - self.base).days, 0)
+        last = min((end - self.base).days, HORIZON_DAYS - 1)
+        if last < first:
+            return []
+
+        query = 0
+        for offset in range(first, last + 1):
+            query |= day_window << (offset * SLOTS_PER_DAY)
+
+        # Slots earlier today are never bookable
+        if first == 0:
+            now = datetime.now()
+            elapsed = (now.hour * 60 + now.minute) // SLOT_MINUTES + 1
+            query &= ~window_mask(0, elapsed)
+
+        if speciality:
+            candidates = self.by_speciality.get(speciality, ())
+        else:
+            candidates = self.doctors.keys()
+
+        results = []
+        for doc_id in candidates:
+            entry = self.doctors[doc_id]
+            if not entry["available"]:
+                continue
+            free = query & ~entry["booked"]
+            if not free:
+                continue
+
+            free_slots = {}
+            for offset in range(first, last + 1):
+                day_bits = (free >> (offset * SLOTS_PER_DAY)) & DAY_MASK
+                if day_bits:
+                    free_slots[format_slot_date(self.base + timedelta(days=offset))] = bitmap_times(day_bits)
+
+            results.append({**entry["info"], "freeSlots": free_slots})
+            if len(results) >= limit:
+                break
+
+        return results
+
+
+availability_index = AvailabilityIndex()
+
+# Changes made while a rebuild is reading doctors, one list per rebuild in progress
+_rebuild_logs = []
+
+
+def _apply(method: str, *args):
+    """Apply a change to the live index and record it for any rebuild in progress."""
+    getattr(availability_index, method)(*args)
+    for log in _rebuild_logs:
+        log.append((method, args))
+
+
+async def rebuild_availability_index():
+    """Load every doctor's bookings into a fresh index and swap it in."""
+    global availability_index
+    doctors = get_doctors_collection()
+
+    log = []
+    _rebuild_logs.append(log)
+    try:
+        index = AvailabilityIndex()
+        async for doctor in doctors.find({}, INDEX_PROJECTION):
+            index.set_doctor(doctor)
+
+        # Bookings and releases that raced the read would otherwise be lost with the old
+        # index. Replaying is idempotent, and no await separates it from the swap.
+        for method, args in log:
+            getattr(index, method)(*args)
+        availability_index = index
+    finally:
+        _rebuild_logs.remove(log)
+
+    logging.info(f"✅ Availability index built for {len(index.doctors)} doctors")
+
+
+async def refresh_doctor_availability(doc_id: str):
+    """Reload a single doctor into the index after their profile or availability changes."""
+    doctors = get_doctors_collection()
+
+    doctor = await doctors.find_one({"_id": ObjectId(doc_id)}, INDEX_PROJECTION)
+    if doctor:
+        _apply("set_doctor", doctor)
+    else:
+        _apply("remove_doctor", doc_id)
+
+
+async def run_availability_rebuild_loop():
+    """Rebuild periodically so changes made by other workers are picked up."""
+    while True:
+        try:
+            await rebuild_availability_index()
+        except Exception as e:
+            logging.error(f"❌ Availability index rebuild failed: {e}")
+        await asyncio.sleep(REBUILD_INTERVAL)
+
+
+async def find_available_doctors(
+    speciality: str = None,
+    start: str = None,
+    end: str = None,
+    from_time: str = None,
+    to_time: str = None,
+    limit: int = 50
+) -> dict:
+    """Find doctors with free slots in a date range and daily time window."""
+    try:
+        start_day = date.fromisoformat(start) if start else date.today()
+        end_day = date.fromisoformat(end) if end else start_day + timedelta(days=6)
+        from_index = parse_slot_time(from_time) if from_time else 0
+        to_index = parse_slot_time(to_time) if to_time else SLOTS_PER_DAY
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+
+    if end_day < start_day:
+        return {"success": False, "message": "end must not be before start"}
+    if (end_day - start_day).days >= HORIZON_DAYS:
+        return {"success": False, "message": f"Date range must be shorter than {HORIZON_DAYS} days"}
+
+    day_window = window_mask(from_index, to_index) & WORKING_HOURS_MASK
+    doctors = availability_index.search(speciality, start_day, end_day, day_window, limit)
+
+    return {"success": True, "doctors": doctors}
+
+
+def mark_booked(doc_id: str, slot_date: str, slot_time: str):
+    _apply("book", doc_id, slot_date, slot_time)
+
+
+def mark_released(doc_id: str, slot_date: str, slot_time: str):
+    _apply("release", doc_id, slot_date, slot_time)
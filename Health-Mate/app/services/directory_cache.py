@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import os
+from ..core.cache import TTLCache
+from ..core import redis as redis_module
+
+# Pre-serialized cache for the public doctor directory
+# Two tiers: a short-lived in-process LRU and one Redis key per page, each with
+# its own TTL. Invalidation bumps a generation number instead of deleting pages:
+# every page records the generation it was built under and is ignored once the
+# generation moves on, so a page computed from a read that started before an
+# invalidation can never be served after it. Other workers pick up the change
+# when their local entries expire.
+
+DIRECTORY_LOCAL_TTL = float(os.getenv("DIRECTORY_LOCAL_TTL", "5"))
+DIRECTORY_REDIS_TTL = int(os.getenv("DIRECTORY_REDIS_TTL", "300"))
+REDIS_PREFIX = "cache:doctor_directory:"
+GENERATION_KEY = "cache:doctor_directory_generation"
+
+_local = TTLCache(maxsize=256, ttl=DIRECTORY_LOCAL_TTL)
+# This process's own invalidation count, guarding the local tier the same way
+_local_generation = 0
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+async def get_cached(key: str) -> tuple[tuple[bytes, str] | None, tuple]:
+    """
+    Look up a serialized directory page.
+    Returns ((body, etag) or None, generation); pass the generation to store()
+    after loading the page so a concurrent invalidation is not overwritten.
+    """
+    entry = _local.get(key)
+    if entry is not None:
+        return entry, None
+
+    generation = (_local_generation, None)
+    client = redis_module.redis_client
+    if not client:
+        return None, generation
+    try:
+        current, raw = await client.mget(GENERATION_KEY, REDIS_PREFIX + key)
+    except Exception as e:
+        logging.warning(f"Directory cache read failed: {e}")
+        return None, generation
+
+    current = current or "0"
+    generation = (_local_generation, current)
+    if raw is None:
+        return None, generation
+
+    page_generation, _, rest = raw.partition("\n")
+    if page_generation != current:
+        return None, generation
+
+    etag, _, body = rest.partition("\n")
+    entry = (body.encode(), etag)
+    _local.set(key, entry)
+    return entry, generation
+
+
+async def store(key: str, body: bytes, generation: tuple) -> tuple[bytes, str]:
+    """Cache a serialized directory page built under generation and return it with its etag."""
+    etag = make_etag(body)
+    entry = (body, etag)
+
+    local_generation, redis_generation = generation
+    # Invalidated while the page was being built; serve it but don't keep it
+    if local_generation != _local_generation:
+        return entry
+    _local.set(key, entry)
+
+    client = redis_module.redis_client
+    if client and redis_generation is not None:
+        try:
+            await client.set(
+                REDIS_PREFIX + key, f"{redis_generation}\n{etag}\n{body.decode()}", ex=DIRECTORY_REDIS_TTL
+            )
+        except Exception as e:
+            logging.warning(f"Directory cache write failed: {e}")
+
+    return entry
+
+
+async def invalidate_directory():
+    """Retire every cached directory page; stale pages age out on their own TTL."""
+    global _local_generation
+    _local_generation += 1
+    _local.clear()
+
+    client = redis_module.redis_client
+    if client:
+        try:
+            await client.incr(GENERATION_KEY)
+        except Exception as e:
+            logging.warning(f"Directory cache invalidation failed: {e}")
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against an etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
@@ -1,8 +1,34 @@
+import asyncio
+from uuid import uuid4
 from bson import ObjectId
+from pymongo import ReturnDocument
 from ..core.database import get_doctors_collection, get_appointments_collection
-from ..core.security import get_password_hash, verify_password, create_access_token
+from ..core.pagination import paginate, InvalidCursorError
+from .appointment_services import hydrate_appointments, invalidate_doctor, parse_object_ids, bulk_cancel_appointments
+from . import directory_cache
+from .availability_services import find_available_doctors, refresh_doctor_availability
+from .slot_services import release_slot
+from .search_services import search_doctors, refresh_doctor_search
+from ..models.doctor_model import DoctorResponse, DoctorPublicResponse
+from ..models.projection import model_projection
+from ..core.security import verify_password_async, create_access_token
+from ..core.counters import record_cancellation, record_completion, get_doctor_counters
+from ..core.metrics import timed
+from ..core.singleflight import single_flight
+from ..core.sessions import store_session
+from ..core.responses import dumps
+from ..core.slots import decode_slots
+from ..core.geocoding import address_location, geocode, to_point
 
+DASHBOARD_LATEST_LIMIT = 5
 
+# Fetch only what each response exposes, so password hashes and the
+# slots_booked map never leave the database for the public list
+DOCTOR_PROJECTION = model_projection(DoctorResponse)
+DOCTOR_PUBLIC_PROJECTION = model_projection(DoctorPublicResponse)
+
+
+@timed
 async def login_doctor(email: str, password: str) -> dict:
     """Login a doctor."""
     doctors = get_doctors_collection()
@@ -11,122 +37,334 @@ async def login_doctor(email: str, password: str) -> dict:
     if not doctor:
         return {"success": False, "message": "Invalid credentials"}
     
-    if not verify_password(password, doctor["password"]):
+    if not await verify_password_async(password, doctor["password"]):
         return {"success": False, "message": "Invalid credentials"}
     
     doctor_id = str(doctor["_id"])
-    token = create_access_token({"id": doctor_id})
+    token = create_access_token(doctor_id)
+    await store_session(doctor_id, token)
     
     return {"success": True, "token": token}
 
 
-async def get_doctor_appointments(doc_id: str) -> dict:
+@timed
+async def get_doctor_appointments(doc_id: str, limit: int = None, cursor: str = None, fetch_all: bool = False) -> dict:
     """Get all appointments for a doctor."""
     appointments = get_appointments_collection()
     
-    cursor = appointments.find({"docId": doc_id})
-    appts = []
-    async for appt in cursor:
+    if fetch_all:
+        cursor_appts = appointments.find({"docId": doc_id})
+        appts = []
+        async for appt in cursor_appts:
+            appt["_id"] = str(appt["_id"])
+            appts.append(appt)
+        
+        await hydrate_appointments(appts, doctors=False)
+        return {"success": True, "appointments": appts}
+    
+    try:
+        appts, next_cursor = await paginate(
+            appointments, {"docId": doc_id}, limit=limit, cursor=cursor, sort_field="date", direction=-1
+        )
+    except InvalidCursorError:
+        return {"success": False, "message": "Invalid cursor"}
+    
+    for appt in appts:
         appt["_id"] = str(appt["_id"])
-        appts.append(appt)
     
-    return {"success": True, "appointments": appts}
+    await hydrate_appointments(appts, doctors=False)
+    return {"success": True, "appointments": appts, "next_cursor": next_cursor}
 
 
+@timed
 async def cancel_doctor_appointment(doc_id: str, appointment_id: str) -> dict:
     """Cancel a doctor's appointment."""
     appointments = get_appointments_collection()
     
-    appt = await appointments.find_one({"_id": ObjectId(appointment_id)})
+    # Ownership is checked in the filter, and the document as it was before the
+    # update tells whether this call is the one that cancelled it
+    appt = await appointments.find_one_and_update(
+        {"_id": ObjectId(appointment_id), "docId": doc_id},
+        {"$set": {"cancelled": True}},
+        projection={"slotDate": 1, "slotTime": 1, "cancelled": 1},
+        return_document=ReturnDocument.BEFORE
+    )
     if not appt:
-        return {"success": False, "message": "Appointment not found"}
-    
-    if appt["docId"] != doc_id:
         return {"success": False, "message": "Invalid doctor or appointment"}
     
-    await appointments.update_one(
-        {"_id": ObjectId(appointment_id)},
-        {"$set": {"cancelled": True}}
-    )
+    # Release only on the first cancel, so a repeat cannot free a slot someone else has rebooked
+    if not appt.get("cancelled"):
+        await release_slot(doc_id, appt["slotDate"], appt["slotTime"])
+        await record_cancellation(doc_id)
     
     return {"success": True, "message": "Appointment Cancelled"}
 
 
+@timed
 async def complete_doctor_appointment(doc_id: str, appointment_id: str) -> dict:
     """Mark an appointment as completed."""
     appointments = get_appointments_collection()
     
-    appt = await appointments.find_one({"_id": ObjectId(appointment_id)})
+    # Returns the document as it was before the update, to know whether it was already completed
+    appt = await appointments.find_one_and_update(
+        {"_id": ObjectId(appointment_id), "docId": doc_id},
+        {"$set": {"isCompleted": True}},
+        projection={"amount": 1, "isCompleted": 1},
+        return_document=ReturnDocument.BEFORE
+    )
     if not appt:
-        return {"success": False, "message": "Appointment not found"}
-    
-    if appt["docId"] != doc_id:
         return {"success": False, "message": "Invalid doctor or appointment"}
     
-    await appointments.update_one(
-        {"_id": ObjectId(appointment_id)},
-        {"$set": {"isCompleted": True}}
-    )
+    if not appt.get("isCompleted"):
+        await record_completion(doc_id, appt.get("amount", 0))
     
     return {"success": True, "message": "Appointment Completed"}
 
 
-async def get_all_doctors() -> dict:
+@timed
+async def cancel_doctor_appointments(doc_id: str, appointment_ids: list) -> dict:
+    """Cancel several of a doctor's appointments at once."""
+    object_ids = parse_object_ids(appointment_ids)
+    if object_ids is None:
+        return {"success": False, "message": "Invalid appointment id"}
+    
+    # Ownership is enforced by the docId filter; other doctors' appointments are skipped
+    cancelled, skipped = await bulk_cancel_appointments(object_ids, scope={"docId": doc_id})
+    
+    return {"success": True, "message": "Appointments Cancelled", "cancelled": cancelled, "skipped": skipped}
+
+
+@timed
+async def complete_doctor_appointments(doc_id: str, appointment_ids: list) -> dict:
+    """Mark several of a doctor's appointments as completed at once."""
+    appointments = get_appointments_collection()
+    
+    object_ids = parse_object_ids(appointment_ids)
+    if object_ids is None:
+        return {"success": False, "message": "Invalid appointment id"}
+    
+    # Tag the rows this call completes, so counters only include those
+    batch = uuid4().hex
+    result = await appointments.update_many(
+        {"_id": {"$in": object_ids}, "docId": doc_id, "isCompleted": {"$ne": True}},
+        {"$set": {"isCompleted": True, "completeBatch": batch}}
+    )
+    
+    completed = []
+    if result.modified_count:
+        completed = await appointments.find(
+            {"_id": {"$in": object_ids}, "completeBatch": batch}, {"amount": 1}
+        ).to_list(length=None)
+        await record_completion(doc_id, sum(appt.get("amount", 0) for appt in completed), count=len(completed))
+    
+    return {
+        "success": True,
+        "message": "Appointments Completed",
+        "completed": len(completed),
+        "skipped": len(object_ids) - len(completed)
+    }
+
+
+@timed
+async def get_all_doctors(limit: int = None, cursor: str = None, fetch_all: bool = False) -> dict:
     """Get list of all doctors (public)."""
     doctors = get_doctors_collection()
     
-    cursor = doctors.find({})
-    docs = []
-    async for doc in cursor:
+    if fetch_all:
+        cursor_docs = doctors.find({}, DOCTOR_PUBLIC_PROJECTION)
+        docs = []
+        async for doc in cursor_docs:
+            doc["_id"] = str(doc["_id"])
+            docs.append(doc)
+        
+        return {"success": True, "doctors": docs}
+    
+    try:
+        docs, next_cursor = await paginate(
+            doctors, {}, limit=limit, cursor=cursor, projection=DOCTOR_PUBLIC_PROJECTION
+        )
+    except InvalidCursorError:
+        return {"success": False, "message": "Invalid cursor"}
+    
+    for doc in docs:
         doc["_id"] = str(doc["_id"])
-        # Remove sensitive fields
-        doc.pop("password", None)
-        doc.pop("email", None)
-        docs.append(doc)
+    
+    return {"success": True, "doctors": docs, "next_cursor": next_cursor}
+
+
+@single_flight
+async def _load_directory_page(limit: int, cursor: str, fetch_all: bool, generation: tuple) -> tuple[dict, bytes]:
+    """
+    Query and serialize one directory page.
+    The cache generation is part of the single-flight key, so callers that start
+    after an invalidation never join a read that began before it.
+    """
+    result = await get_all_doctors(limit=limit, cursor=cursor, fetch_all=fetch_all)
+    return result, dumps(result)
+
+
+@timed
+async def get_doctor_directory(limit: int = None, cursor: str = None, fetch_all: bool = False) -> tuple[bytes, str]:
+    """Get the public doctor list pre-serialized as (body, etag), served from cache when possible."""
+    key = f"{limit}:{cursor or ''}:{int(fetch_all)}"
+    
+    cached, generation = await directory_cache.get_cached(key)
+    if cached:
+        return cached
+    
+    result, body = await _load_directory_page(limit, cursor, fetch_all, generation)
+    
+    # Errors (e.g. an invalid cursor) are not worth caching
+    if not result["success"]:
+        return body, directory_cache.make_etag(body)
+    
+    return await directory_cache.store(key, body, generation)
+
+
+@timed
+async def search_directory(
+    q: str = None,
+    speciality: str = None,
+    degree: str = None,
+    min_fee: float = None,
+    max_fee: float = None,
+    available: bool = None,
+    limit: int = 20
+) -> dict:
+    """Search doctors by text with facet filters and counts (public)."""
+    return await search_doctors(
+        q=q, speciality=speciality, degree=degree, min_fee=min_fee, max_fee=max_fee, available=available, limit=limit
+    )
+
+
+@timed
+async def get_nearby_doctors(
+    lat: float = None,
+    lng: float = None,
+    place: str = None,
+    max_km: float = 10,
+    speciality: str = None,
+    available: bool = None,
+    limit: int = 20
+) -> dict:
+    """Doctors ordered by distance from a point or a named place (public)."""
+    if lat is None or lng is None:
+        coordinates = geocode(place)
+        if coordinates is None:
+            return {"success": False, "message": "Provide lat and lng, or a known place"}
+        lat, lng = coordinates
+    
+    try:
+        near = to_point(lat, lng)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    
+    query = {}
+    if speciality:
+        query["speciality"] = speciality
+    if available is not None:
+        query["available"] = available
+    
+    # $geoNear uses the location_2dsphere index and applies the filters in the same pass
+    pipeline = [
+        {"$geoNear": {
+            "near": near,
+            "distanceField": "distance",
+            "maxDistance": max_km * 1000,
+            "query": query,
+            "spherical": True,
+        }},
+        {"$limit": limit},
+        {"$project": {**DOCTOR_PUBLIC_PROJECTION, "distance": 1}},
+    ]
+    
+    doctors = get_doctors_collection()
+    docs = await doctors.aggregate(pipeline).to_list(length=limit)
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+        doc["distanceKm"] = round(doc.pop("distance") / 1000, 2)
     
     return {"success": True, "doctors": docs}
 
 
+@timed
+async def search_availability(
+    speciality: str = None,
+    start: str = None,
+    end: str = None,
+    from_time: str = None,
+    to_time: str = None,
+    limit: int = 50
+) -> dict:
+    """Find doctors with free slots (public)."""
+    return await find_available_doctors(
+        speciality=speciality, start=start, end=end, from_time=from_time, to_time=to_time, limit=limit
+    )
+
+
+@timed
 async def change_doctor_availability(doc_id: str) -> dict:
     """Toggle doctor's availability."""
-    doctors = get_doctors_collection()
-    
-    doctor = await doctors.find_one({"_id": ObjectId(doc_id)})
-    if not doctor:
+    available = await toggle_availability(doc_id)
+    if available is None:
         return {"success": False, "message": "Doctor not found"}
     
-    current_available = doctor.get("available", True)
-    await doctors.update_one(
+    return {"success": True, "message": "Availability changed successfully", "available": available}
+
+
+async def toggle_availability(doc_id: str) -> bool | None:
+    """Atomically flip a doctor's availability; returns the new value, or None if not found."""
+    doctors = get_doctors_collection()
+    
+    # Pipeline update negates the stored value server-side, so concurrent toggles never race
+    doctor = await doctors.find_one_and_update(
         {"_id": ObjectId(doc_id)},
-        {"$set": {"available": not current_available}}
+        [{"$set": {"available": {"$not": [{"$ifNull": ["$available", True]}]}}}],
+        projection={"available": 1},
+        return_document=ReturnDocument.AFTER
     )
+    if not doctor:
+        return None
     
-    return {"success": True, "message": "Availability changed successfully"}
+    await directory_cache.invalidate_directory()
+    await refresh_doctor_availability(doc_id)
+    await refresh_doctor_search(doc_id)
+    return doctor["available"]
 
 
+@timed
+@single_flight
 async def get_doctor_profile(doc_id: str) -> dict:
     """Get doctor's profile."""
     doctors = get_doctors_collection()
     
-    doctor = await doctors.find_one({"_id": ObjectId(doc_id)})
+    doctor = await doctors.find_one({"_id": ObjectId(doc_id)}, DOCTOR_PROJECTION)
     if not doctor:
         return {"success": False, "message": "Doctor not found"}
     
     doctor["_id"] = str(doctor["_id"])
-    doctor.pop("password", None)
+    doctor["slots_booked"] = decode_slots(doctor.get("slots_booked"))
     
     return {"success": True, "profileData": doctor}
 
 
+@timed
 async def update_doctor_profile(doc_id: str, fees: float = None, address: dict = None, available: bool = None, about: str = None) -> dict:
     """Update doctor's profile."""
     doctors = get_doctors_collection()
     
     update_data = {}
+    unset_data = {}
     if fees is not None:
         update_data["fees"] = fees
     if address is not None:
         update_data["address"] = address
+        location = address_location(address)
+        if location:
+            update_data["location"] = location
+        else:
+            # An address that no longer resolves must not keep the old coordinates
+            unset_data["location"] = ""
     if available is not None:
         update_data["available"] = available
     if about is not None:
@@ -135,35 +373,61 @@ async def update_doctor_profile(doc_id: str, fees: float = None, address: dict =
     if update_data:
         await doctors.update_one(
             {"_id": ObjectId(doc_id)},
-            {"$set": update_data}
+            {"$set": update_data, **({"$unset": unset_data} if unset_data else {})}
         )
+        invalidate_doctor(doc_id)
+        await directory_cache.invalidate_directory()
+        await refresh_doctor_availability(doc_id)
+        await refresh_doctor_search(doc_id)
     
     return {"success": True, "message": "Profile Updated"}
 
 
+@timed
 async def get_doctor_dashboard(doc_id: str) -> dict:
     """Get doctor's dashboard data."""
     appointments = get_appointments_collection()
     
-    cursor = appointments.find({"docId": doc_id})
-    appts = []
-    async for appt in cursor:
-        appt["_id"] = str(appt["_id"])
-        appts.append(appt)
+    async def latest_appointments() -> list:
+        latest_cursor = appointments.find({"docId": doc_id}).sort("date", -1).limit(DASHBOARD_LATEST_LIMIT)
+        latest = await latest_cursor.to_list(length=DASHBOARD_LATEST_LIMIT)
+        for appt in latest:
+            appt["_id"] = str(appt["_id"])
+        await hydrate_appointments(latest, doctors=False)
+        return latest
     
-    earnings = 0
-    patient_set = set()
+    async def doctor_totals() -> dict:
+        # The aggregation fallback runs alongside the latest appointments rather than after them
+        return await get_doctor_counters(doc_id) or await _aggregate_doctor_totals(doc_id)
     
-    for appt in appts:
-        if appt.get("isCompleted") or appt.get("payment"):
-            earnings += appt.get("amount", 0)
-        patient_set.add(appt.get("userId"))
+    totals, latest = await asyncio.gather(doctor_totals(), latest_appointments())
     
     dash_data = {
-        "earnings": earnings,
-        "appointments": len(appts),
-        "patients": len(patient_set),
-        "latestAppointments": list(reversed(appts))[:5]
+        "earnings": totals["earnings"],
+        "appointments": totals["appointments"],
+        "patients": totals["patients"],
+        "latestAppointments": latest
     }
     
     return {"success": True, "dashData": dash_data}
+
+
+async def _aggregate_doctor_totals(doc_id: str) -> dict:
+    """Compute dashboard totals on the server when maintained counters are unavailable."""
+    appointments = get_appointments_collection()
+    
+    totals_pipeline = [
+        {"$match": {"docId": doc_id}},
+        {"$group": {
+            "_id": None,
+            "earnings": {"$sum": {
+                "$cond": [{"$or": ["$isCompleted", "$payment"]}, {"$ifNull": ["$amount", 0]}, 0]
+            }},
+            "appointments": {"$sum": 1},
+            "patients": {"$addToSet": "$userId"}
+        }},
+        {"$project": {"_id": 0, "earnings": 1, "appointments": 1, "patients": {"$size": "$patients"}}}
+    ]
+    
+    totals = await appointments.aggregate(totals_pipeline).to_list(length=1)
+    return totals[0] if totals else {"earnings": 0, "appointments": 0, "patients": 0}
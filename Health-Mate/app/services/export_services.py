@@ -0,0 +1,110 @@
+import csv
+import io
+import os
+from datetime import date, datetime, timedelta
+from ..core.database import get_appointments_collection
+from ..core.responses import dumps
+
+# Streaming appointment export
+# Rows are read from one Motor cursor and written out a batch at a time,
+# so memory stays flat no matter how many appointments match.
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_COLUMNS = (
+    "_id", "userId", "userName", "docId", "doctorName", "speciality",
+    "slotDate", "slotTime", "amount", "date", "cancelled", "payment", "isCompleted",
+)
+
+EXPORT_PROJECTION = {
+    "userId": 1, "docId": 1, "slotDate": 1, "slotTime": 1, "amount": 1, "date": 1,
+    "cancelled": 1, "payment": 1, "isCompleted": 1,
+    "userData.name": 1, "docData.name": 1, "docData.speciality": 1,
+}
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _epoch_ms(day: date) -> int:
+    return int(datetime(day.year, day.month, day.day).timestamp() * 1000)
+
+
+def build_export_query(doc_id: str = None, start: str = None, end: str = None) -> dict:
+    """
+    Filter on booking time (the appointment's "date" field) and doctor.
+    start and end are inclusive YYYY-MM-DD dates. Raises ValueError on bad dates.
+    """
+    query = {}
+    if doc_id:
+        query["docId"] = doc_id
+
+    date_range = {}
+    if start:
+        date_range["$gte"] = _epoch_ms(date.fromisoformat(start))
+    if end:
+        date_range["$lt"] = _epoch_ms(date.fromisoformat(end) + timedelta(days=1))
+    if date_range:
+        query["date"] = date_range
+
+    return query
+
+
+def _row(appt: dict) -> dict:
+    user = appt.get("userData") or {}
+    doctor = appt.get("docData") or {}
+    return {
+        "_id": str(appt["_id"]),
+        "userId": appt.get("userId"),
+        "userName": user.get("name"),
+        "docId": appt.get("docId"),
+        "doctorName": doctor.get("name"),
+        "speciality": doctor.get("speciality"),
+        "slotDate": appt.get("slotDate"),
+        "slotTime": appt.get("slotTime"),
+        "amount": appt.get("amount"),
+        "date": appt.get("date"),
+        "cancelled": bool(appt.get("cancelled")),
+        "payment": bool(appt.get("payment")),
+        "isCompleted": bool(appt.get("isCompleted")),
+    }
+
+
+def _encode_ndjson(rows: list) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def _encode_csv(rows: list) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue().encode()
+
+
+async def stream_appointments(query: dict, fmt: str, batch_size: int = EXPORT_BATCH_SIZE):
+    """Yield encoded appointment rows, one chunk per cursor batch."""
+    appointments = get_appointments_collection()
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+
+    if fmt == "csv":
+        yield _csv_header()
+
+    cursor = appointments.find(query, EXPORT_PROJECTION).sort("date", -1).batch_size(batch_size)
+
+    rows = []
+    async for appt in cursor:
+        rows.append(_row(appt))
+        if len(rows) >= batch_size:
+            yield encode(rows)
+            rows = []
+
+    if rows:
+        yield encode(rows)
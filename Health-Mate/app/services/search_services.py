@@ -0,0 +1,518 @@
+import asyncio
+import heapq
+import logging
+import os
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from bson import ObjectId
+from ..core.database import get_doctors_collection
+from ..models.doctor_model import DoctorPublicResponse
+from ..models.projection import model_projection
+
+# Doctor directory search
+# An in-memory inverted index (token -> {doctor id: weight}) plus one posting
+# set per facet value answers text + facet queries with set intersections.
+# Doctor writes refresh single entries: the sorted name, fee and token orders
+# and the matches cached for recent queries are updated in place, so no search
+# pays for a re-sort or a full recount after a write. A periodic rebuild picks
+# up changes made by other workers. Until the first build finishes, searches
+# fall back to an equivalent Mongo query.
+
+REBUILD_INTERVAL = int(os.getenv("SEARCH_REBUILD_INTERVAL", "300"))
+MAX_SEARCH_LIMIT = 100
+# Queries whose matches are kept between searches; each holds its matching ids
+MATCH_CACHE_SIZE = 256
+
+SEARCH_PROJECTION = model_projection(DoctorPublicResponse)
+
+# Score a term earns per occurrence in each field
+FIELD_WEIGHTS = {"name": 10, "speciality": 5, "degree": 3, "about": 1}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({"a", "an", "and", "the", "of", "in", "for", "with", "to", "is", "dr"})
+
+
+def tokenize(text: str) -> list:
+    return [token for token in _TOKEN.findall((text or "").lower()) if token not in _STOPWORDS]
+
+
+def term_pattern(term: str, prefix: bool) -> str:
+    """
+    Case-insensitive regex finding a term where tokenize() would produce it:
+    as a whole token, or for a prefix term at the start of a token that is not a stopword.
+    """
+    pattern = rf"(?<![a-z0-9]){re.escape(term)}"
+    if not prefix:
+        return pattern + r"(?![a-z0-9])"
+    stopwords = "|".join(sorted(word for word in _STOPWORDS if word.startswith(term)))
+    if stopwords:
+        pattern = rf"(?<![a-z0-9])(?!(?:{stopwords})(?![a-z0-9])){re.escape(term)}"
+    return pattern
+
+
+class DoctorSearchIndex:
+    def __init__(self):
+        self.ready = False
+        self.doctors = {}
+        self.postings = {}
+        # token -> {weight: doctor ids}, so multi-term ranking works on whole weight groups
+        self.weight_groups = {}
+        self.by_speciality = {}
+        self.by_degree = {}
+        self.available = set()
+        self.speciality_of = {}
+        self.degree_of = {}
+        self.fees_of = {}
+        # Each doctor's (speciality, degree, available) combination as a small int,
+        # so facet counts over a result set take one counting pass
+        self._facet_code_of = {}
+        self._facet_codes = {}
+        self._facet_combos = []
+        # Sorted tokens for prefix lookups
+        self._vocabulary = []
+        # Sorted (name, doctor id) pairs, and each doctor's pair, for name ordering
+        self._name_order = []
+        self._name_key = {}
+        # Doctor ids sorted by fee, with the fees alongside for bisection
+        self._fee_order = []
+        self._fee_values = []
+        # Query terms -> (matching ids, Counter of their facet codes), kept exact on every write
+        self._matches = {}
+
+    def set_doctor(self, doctor: dict):
+        doc_id = str(doctor["_id"])
+        entry = self.doctors.get(doc_id)
+        old_weights = entry["weights"] if entry else {}
+        old_code = self._unindex_fields(doc_id) if entry else None
+
+        weights = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(doctor.get(field)):
+                weights[token] += weight
+
+        for token in old_weights.keys() | weights.keys():
+            if old_weights.get(token) != weights.get(token):
+                if token in old_weights:
+                    self._unpost(doc_id, token, old_weights[token])
+                if token in weights:
+                    self._post(doc_id, token, weights[token])
+
+        speciality = doctor.get("speciality", "")
+        degree = doctor.get("degree", "")
+        self.doctors[doc_id] = {"info": {**doctor, "_id": doc_id}, "weights": dict(weights)}
+        self.by_speciality.setdefault(speciality, set()).add(doc_id)
+        self.by_degree.setdefault(degree, set()).add(doc_id)
+        self.speciality_of[doc_id] = speciality
+        self.degree_of[doc_id] = degree
+        fee = self.fees_of[doc_id] = doctor.get("fees") or 0
+        position = bisect_right(self._fee_values, fee)
+        self._fee_values.insert(position, fee)
+        self._fee_order.insert(position, doc_id)
+        name_key = self._name_key[doc_id] = (doctor.get("name") or "", doc_id)
+        insort(self._name_order, name_key)
+        if doctor.get("available", True):
+            self.available.add(doc_id)
+        combo = (speciality, degree, doc_id in self.available)
+        if combo not in self._facet_codes:
+            self._facet_codes[combo] = len(self._facet_combos)
+            self._facet_combos.append(combo)
+        code = self._facet_code_of[doc_id] = self._facet_codes[combo]
+        self._update_matches(doc_id, old_code, weights, code)
+
+    def remove_doctor(self, doc_id: str):
+        entry = self.doctors.pop(doc_id, None)
+        if not entry:
+            return
+        for token, weight in entry["weights"].items():
+            self._unpost(doc_id, token, weight)
+        old_code = self._unindex_fields(doc_id)
+        self._update_matches(doc_id, old_code, {}, None)
+
+    def _post(self, doc_id: str, token: str, weight: int):
+        if token not in self.postings:
+            self.postings[token] = {}
+            self.weight_groups[token] = {}
+            insort(self._vocabulary, token)
+        self.postings[token][doc_id] = weight
+        self.weight_groups[token].setdefault(weight, set()).add(doc_id)
+
+    def _unpost(self, doc_id: str, token: str, weight: int):
+        postings = self.postings[token]
+        del postings[doc_id]
+        groups = self.weight_groups[token]
+        groups[weight].discard(doc_id)
+        if not groups[weight]:
+            del groups[weight]
+        if not postings:
+            del self.postings[token]
+            del self.weight_groups[token]
+            del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _unindex_fields(self, doc_id: str) -> int:
+        """Take a doctor out of the facet, fee and name structures; returns its facet code."""
+        self.by_speciality.get(self.speciality_of.pop(doc_id), set()).discard(doc_id)
+        self.by_degree.get(self.degree_of.pop(doc_id), set()).discard(doc_id)
+        fee = self.fees_of.pop(doc_id)
+        position = self._fee_order.index(
+            doc_id, bisect_left(self._fee_values, fee), bisect_right(self._fee_values, fee)
+        )
+        del self._fee_values[position]
+        del self._fee_order[position]
+        del self._name_order[bisect_left(self._name_order, self._name_key.pop(doc_id))]
+        self.available.discard(doc_id)
+        return self._facet_code_of.pop(doc_id)
+
+    def _update_matches(self, doc_id: str, old_code: int | None, weights: dict, code: int | None):
+        """
+        Move one written doctor in or out of every cached match and its facet
+        counts. A match covers the doctor when every term but the last is one
+        of its tokens and the last is a prefix of one.
+        """
+        if not self._matches:
+            return
+        prefixes = {token[:end] for token in weights for end in range(1, len(token) + 1)}
+
+        for terms, (ids, codes) in self._matches.items():
+            if doc_id in ids:
+                ids.discard(doc_id)
+                codes[old_code] -= 1
+            if code is not None and terms[-1] in prefixes and all(term in weights for term in terms[:-1]):
+                ids.add(doc_id)
+                codes[code] += 1
+
+    def _clear_matches(self):
+        self._matches.clear()
+
+    def _term_groups(self, terms: tuple) -> list:
+        """Each term's (weight, doctor ids) groups, best first; the last term is matched as a prefix."""
+        term_groups = []
+        for position, term in enumerate(terms):
+            if position < len(terms) - 1:
+                tokens = [term] if term in self.postings else []
+            else:
+                tokens = self._prefix_tokens(term)
+            term_groups.append(sorted(
+                (group for token in tokens for group in self.weight_groups[token].items()),
+                key=lambda group: group[0],
+                reverse=True
+            ))
+        return term_groups
+
+    def _match(self, terms: tuple) -> tuple[set, Counter]:
+        """
+        Doctors matching every term, the last one as a prefix, and a count of their
+        facet codes. Cached per query and kept exact by writes, so repeated and
+        paged searches, and searches after a write, skip the set work.
+        """
+        match = self._matches.get(terms)
+        if match is None:
+            *exact, last = terms
+            sets = [self.postings.get(term, {}).keys() for term in exact]
+            prefix_tokens = self._prefix_tokens(last)
+            if len(prefix_tokens) == 1:
+                sets.append(self.postings[prefix_tokens[0]].keys())
+            else:
+                sets.append(set().union(*[self.postings[token] for token in prefix_tokens]))
+
+            sets.sort(key=len)
+            ids = set(sets[0])
+            for other in sets[1:]:
+                if not ids:
+                    break
+                ids.intersection_update(other)
+
+            if len(self._matches) >= MATCH_CACHE_SIZE:
+                self._matches.clear()
+            match = self._matches[terms] = (ids, Counter(map(self._facet_code_of.__getitem__, ids)))
+        return match
+
+    def _top_scored(self, term_groups: list, candidates, limit: int) -> list:
+        """
+        Best limit candidates by summed term weight, then name, for one or more terms.
+        Weight combinations are walked best-first one score level at a time, so
+        only the groups that can reach the page are intersected, in C, instead
+        of scoring every match. A doctor matching a prefix term through several
+        tokens counts with the best one, since it is taken at its first level.
+        """
+        def score(combo):
+            return -sum(groups[i][0] for groups, i in zip(term_groups, combo))
+
+        start = (0,) * len(term_groups)
+        heap = [(score(start), start)]
+        visited = {start}
+        top = []
+        seen = set()
+
+        while heap and len(top) < limit:
+            level = heap[0][0]
+            found = set()
+            while heap and heap[0][0] == level:
+                _, combo = heapq.heappop(heap)
+                sets = sorted((groups[i][1] for groups, i in zip(term_groups, combo)), key=len)
+                found |= candidates.intersection(*sets)
+
+                for position, i in enumerate(combo):
+                    if i + 1 < len(term_groups[position]):
+                        successor = combo[:position] + (i + 1,) + combo[position + 1:]
+                        if successor not in visited:
+                            visited.add(successor)
+                            heapq.heappush(heap, (score(successor), successor))
+
+            found -= seen
+            seen |= found
+            top.extend(self._by_name(found, limit - len(top)))
+
+        return top
+
+    def _fee_range(self, low: float, high: float) -> list:
+        """Ids of doctors whose fee is within [low, high], via bisection over doctors sorted by fee."""
+        return self._fee_order[bisect_left(self._fee_values, low):bisect_right(self._fee_values, high)]
+
+    def _prefix_tokens(self, prefix: str) -> list:
+        i = bisect_left(self._vocabulary, prefix)
+        j = i
+        while j < len(self._vocabulary) and self._vocabulary[j].startswith(prefix):
+            j += 1
+        return self._vocabulary[i:j]
+
+    def _facets(self, candidates, codes: Counter = None) -> tuple[int, dict]:
+        """
+        Result count and facet counts; candidates None means every doctor.
+        codes is a count of the candidates' facet codes when one is already kept.
+        """
+        if candidates is None:
+            total = len(self.doctors)
+            available_count = len(self.available)
+            speciality = {value: len(ids) for value, ids in self.by_speciality.items() if ids}
+            degree = {value: len(ids) for value, ids in self.by_degree.items() if ids}
+        else:
+            # One C-level counting pass over the candidates, then a few dozen combinations to fold
+            if codes is None:
+                codes = Counter(map(self._facet_code_of.__getitem__, candidates))
+            total = len(candidates)
+            available_count = 0
+            speciality, degree = Counter(), Counter()
+            for code, count in codes.items():
+                if not count:
+                    continue
+                speciality_value, degree_value, is_available = self._facet_combos[code]
+                speciality[speciality_value] += count
+                degree[degree_value] += count
+                if is_available:
+                    available_count += count
+
+        return total, {
+            "speciality": dict(speciality),
+            "degree": dict(degree),
+            "available": {"true": available_count, "false": total - available_count},
+        }
+
+    def _by_name(self, candidates, limit: int) -> list:
+        """First limit candidates in name order; candidates None means every doctor."""
+        if candidates is None:
+            return [doc_id for _, doc_id in self._name_order[:limit]]
+        # Walking the name order finds limit candidates after about limit * doctors / candidates
+        # steps, so it wins for large sets; small ones are cheaper to pick from directly
+        if len(candidates) ** 2 < limit * len(self._name_order):
+            return heapq.nsmallest(limit, candidates, key=self._name_key.__getitem__)
+        top = []
+        for _, doc_id in self._name_order:
+            if doc_id in candidates:
+                top.append(doc_id)
+                if len(top) >= limit:
+                    break
+        return top
+
+    def search(
+        self,
+        q: str = None,
+        speciality: str = None,
+        degree: str = None,
+        min_fee: float = None,
+        max_fee: float = None,
+        available: bool = None,
+        limit: int = 20
+    ) -> dict:
+        terms = tokenize(q)
+
+        # Text match: every full term must appear, the last one may be a prefix
+        candidates = codes = None
+        if terms:
+            terms = tuple(terms)
+            candidates, codes = self._match(terms)
+
+        # Filters are set algebra; None means "every doctor" and avoids copying the full set.
+        # Any filter makes a new set, so the cached facet counts only fit an unfiltered match.
+        for ids in (
+            self.by_speciality.get(speciality, set()) if speciality else None,
+            self.by_degree.get(degree, set()) if degree else None,
+            self.available if available is True else None,
+        ):
+            if ids is not None:
+                candidates = ids if candidates is None else ids & candidates
+                codes = None
+        if available is False:
+            candidates = (candidates if candidates is not None else self.doctors.keys()) - self.available
+            codes = None
+        if min_fee is not None or max_fee is not None:
+            low = min_fee if min_fee is not None else float("-inf")
+            high = max_fee if max_fee is not None else float("inf")
+            in_range = self._fee_range(low, high)
+            candidates = set(in_range) if candidates is None else candidates.intersection(in_range)
+            codes = None
+
+        total, facets = self._facets(candidates, codes)
+
+        if not terms:
+            top = self._by_name(candidates, limit)
+        else:
+            top = self._top_scored(self._term_groups(terms), candidates, limit) if candidates else []
+
+        return {
+            "total": total,
+            "doctors": [self.doctors[doc_id]["info"] for doc_id in top],
+            "facets": facets,
+        }
+
+
+search_index = DoctorSearchIndex()
+
+# Changes made while a rebuild is reading doctors, one list per rebuild in progress
+_rebuild_logs = []
+
+
+def _apply(method: str, *args):
+    """Apply a change to the live index and record it for any rebuild in progress."""
+    getattr(search_index, method)(*args)
+    for log in _rebuild_logs:
+        log.append((method, args))
+
+
+async def rebuild_search_index():
+    """Load every doctor into a fresh index and swap it in."""
+    global search_index
+    doctors = get_doctors_collection()
+
+    log = []
+    _rebuild_logs.append(log)
+    try:
+        index = DoctorSearchIndex()
+        async for doctor in doctors.find({}, SEARCH_PROJECTION):
+            index.set_doctor(doctor)
+
+        # Re-apply writes that raced the read, with no await before the swap
+        for method, args in log:
+            getattr(index, method)(*args)
+        index.ready = True
+        search_index = index
+    finally:
+        _rebuild_logs.remove(log)
+
+    logging.info(f"✅ Search index built for {len(index.doctors)} doctors")
+
+
+async def refresh_doctor_search(doc_id: str):
+    """Re-index a single doctor after a write."""
+    doctors = get_doctors_collection()
+
+    doctor = await doctors.find_one({"_id": ObjectId(doc_id)}, SEARCH_PROJECTION)
+    if doctor:
+        _apply("set_doctor", doctor)
+    else:
+        _apply("remove_doctor", doc_id)
+
+
+async def run_search_rebuild_loop():
+    """Rebuild periodically so changes made by other workers are picked up."""
+    while True:
+        try:
+            await rebuild_search_index()
+        except Exception as e:
+            logging.error(f"❌ Search index rebuild failed: {e}")
+        await asyncio.sleep(REBUILD_INTERVAL)
+
+
+async def _search_mongo(q, speciality, degree, min_fee, max_fee, available, limit) -> dict:
+    """
+    Same search answered by Mongo, used while the in-memory index is still building.
+    Terms match as in the index: every term as a whole token, the last as a prefix.
+    Scores add each field's weight per occurrence, so a prefix term found through
+    several tokens counts all of them rather than only the best one.
+    """
+    doctors = get_doctors_collection()
+    terms = tokenize(q)
+    patterns = [term_pattern(term, prefix=position == len(terms) - 1) for position, term in enumerate(terms)]
+
+    match = {}
+    if patterns:
+        match["$and"] = [
+            {"$or": [{field: {"$regex": pattern, "$options": "i"}} for field in FIELD_WEIGHTS]}
+            for pattern in patterns
+        ]
+    if speciality:
+        match["speciality"] = speciality
+    if degree:
+        match["degree"] = degree
+    if min_fee is not None or max_fee is not None:
+        match["fees"] = {
+            **({"$gte": min_fee} if min_fee is not None else {}),
+            **({"$lte": max_fee} if max_fee is not None else {}),
+        }
+    if available is not None:
+        match["available"] = available
+
+    ranking = [{"$sort": {"name": 1, "_id": 1}}]
+    if patterns:
+        score = {"$add": [
+            {"$multiply": [weight, {"$size": {"$regexFindAll": {
+                "input": {"$ifNull": [f"${field}", ""]}, "regex": pattern, "options": "i"
+            }}}]}
+            for pattern in patterns
+            for field, weight in FIELD_WEIGHTS.items()
+        ]}
+        ranking = [{"$addFields": {"score": score}}, {"$sort": {"score": -1, "name": 1, "_id": 1}}]
+
+    pipeline = [
+        {"$match": match},
+        {"$facet": {
+            "doctors": [*ranking, {"$limit": limit}, {"$project": SEARCH_PROJECTION}],
+            "total": [{"$count": "count"}],
+            "speciality": [{"$sortByCount": "$speciality"}],
+            "degree": [{"$sortByCount": "$degree"}],
+            "available": [{"$sortByCount": {"$toString": {"$ifNull": ["$available", True]}}}],
+        }},
+    ]
+
+    result = (await doctors.aggregate(pipeline).to_list(length=1))[0]
+    for doctor in result["doctors"]:
+        doctor["_id"] = str(doctor["_id"])
+
+    return {
+        "total": result["total"][0]["count"] if result["total"] else 0,
+        "doctors": result["doctors"],
+        "facets": {
+            name: {row["_id"]: row["count"] for row in result[name]}
+            for name in ("speciality", "degree", "available")
+        },
+    }
+
+
+async def search_doctors(
+    q: str = None,
+    speciality: str = None,
+    degree: str = None,
+    min_fee: float = None,
+    max_fee: float = None,
+    available: bool = None,
+    limit: int = 20
+) -> dict:
+    """Full-text and faceted doctor search."""
+    limit = min(limit, MAX_SEARCH_LIMIT)
+
+    if search_index.ready:
+        result = search_index.search(q, speciality, degree, min_fee, max_fee, available, limit)
+    else:
+        result = await _search_mongo(q, speciality, degree, min_fee, max_fee, available, limit)
+
+    return {"success": True, **result}
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from bson import ObjectId
+from bson.int64 import Int64
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from ..core.database import get_doctors_collection
+from ..core.slots import DAY_MASK, decode_day, parse_slot_time, slot_mask, is_past
+from .availability_services import mark_booked, mark_released
+
+# Booked slots are one Int64 bitmap per date (see core/slots.py), so a booking
+# is a $bit OR guarded by $bitsAnySet and a release is a $bit AND.
+# Days written before the bitmap encoding may still hold lists of times until
+# the encode-slots migration has run; $bit fails on those and $bitsAnySet never
+# matches them, so a write that hits one converts that doctor's day and retries.
+
+PRUNE_INTERVAL = int(os.getenv("SLOT_PRUNE_INTERVAL", "86400"))
+PRUNE_BATCH_SIZE = 500
+
+
+def _slot_field(slot_date: str) -> str:
+    # slotDate becomes part of a field path, so it must not contain path operators
+    if not slot_date or "." in slot_date or slot_date.startswith("$"):
+        raise ValueError("Invalid slot date")
+    return f"slots_booked.{slot_date}"
+
+
+async def _encode_list_days(doctors, doc_id: str, slot_dates) -> bool:
+    """
+    Convert a doctor's list-valued days among slot_dates to bitmaps.
+    Returns True if any of them held a list, so the caller's write is worth retrying.
+    """
+    fields = {_slot_field(slot_date) for slot_date in slot_dates}
+    doctor = await doctors.find_one({"_id": ObjectId(doc_id)}, {field: 1 for field in fields})
+    days = (doctor or {}).get("slots_booked") or {}
+    lists = {
+        _slot_field(slot_date): value
+        for slot_date, value in days.items()
+        if _slot_field(slot_date) in fields and isinstance(value, list)
+    }
+    if not lists:
+        return False
+
+    # Conditional on the lists being unchanged; if another writer converted them first, retrying is still right
+    await doctors.update_one(
+        {"_id": ObjectId(doc_id), **lists},
+        {"$set": {field: Int64(decode_day(value)) for field, value in lists.items()}}
+    )
+    logging.info(f"Encoded {len(lists)} list-valued slot days for doctor {doc_id}")
+    return True
+
+
+async def reserve_slot(doc_id: str, slot_date: str, slot_time: str, projection: dict = None) -> dict | None:
+    """
+    Atomically reserve a slot for an available doctor.
+    Returns the doctor document, or None if the doctor is unavailable or the slot is taken.
+    Raises ValueError for a malformed slot date or time.
+    """
+    doctors = get_doctors_collection()
+    field = _slot_field(slot_date)
+    mask = Int64(slot_mask(parse_slot_time(slot_time)))
+
+    # The filter and the $bit run as one document update,
+    # so two concurrent bookings for the same slot cannot both match.
+    # A missing date has no bits set, and $bit treats it as 0.
+    async def attempt():
+        return await doctors.find_one_and_update(
+            {"_id": ObjectId(doc_id), "available": True, field: {"$not": {"$bitsAnySet": mask}}},
+            {"$bit": {field: {"or": mask}}},
+            projection=projection,
+            return_document=ReturnDocument.BEFORE
+        )
+
+    try:
+        doctor = await attempt()
+    except OperationFailure:
+        # $bit on a day still stored as a list; anything else is re-raised
+        if not await _encode_list_days(doctors, doc_id, [slot_date]):
+            raise
+        doctor = await attempt()
+    if doctor:
+        mark_booked(doc_id, slot_date, slot_time)
+    return doctor
+
+
+async def release_slot(doc_id: str, slot_date: str, slot_time: str) -> bool:
+    """Release a previously reserved slot; returns False if it was not booked."""
+    doctors = get_doctors_collection()
+    try:
+        field = _slot_field(slot_date)
+        mask = slot_mask(parse_slot_time(slot_time))
+    except ValueError:
+        # Nothing could have been reserved for a slot that does not parse
+        return False
+
+    async def attempt() -> bool:
+        result = await doctors.update_one(
+            {"_id": ObjectId(doc_id), field: {"$bitsAnySet": Int64(mask)}},
+            {"$bit": {field: {"and": Int64(DAY_MASK & ~mask)}}}
+        )
+        return result.modified_count == 1
+
+    # $bitsAnySet never matches a day still stored as a list
+    released = await attempt() or (await _encode_list_days(doctors, doc_id, [slot_date]) and await attempt())
+    mark_released(doc_id, slot_date, slot_time)
+    if not released:
+        logging.warning(f"Released slot {slot_date} {slot_time} of doctor {doc_id} was not booked")
+    return released
+
+
+async def release_slots(slots: list) -> int:
+    """
+    Release many reserved slots, given as (doc_id, slot_date, slot_time) tuples.
+    Issues one bulk_write with a single update per doctor.
+    """
+    masks = defaultdict(lambda: defaultdict(int))
+    for doc_id, slot_date, slot_time in slots:
+        try:
+            masks[doc_id][_slot_field(slot_date)] |= slot_mask(parse_slot_time(slot_time))
+        except ValueError:
+            continue
+
+    if not masks:
+        return 0
+
+    doctors = get_doctors_collection()
+
+    def operation(doc_id: str) -> UpdateOne:
+        return UpdateOne(
+            {"_id": ObjectId(doc_id)},
+            {"$bit": {field: {"and": Int64(DAY_MASK & ~mask)} for field, mask in masks[doc_id].items()}}
+        )
+
+    doc_ids = list(masks)
+    try:
+        modified = (await doctors.bulk_write([operation(doc_id) for doc_id in doc_ids], ordered=False)).modified_count
+    except BulkWriteError as e:
+        # $bit fails on days still stored as lists; convert those doctors' days and retry them once
+        modified = e.details.get("nModified", 0)
+        retry = []
+        for error in e.details.get("writeErrors", []):
+            doc_id = doc_ids[error["index"]]
+            slot_dates = [field.split(".", 1)[1] for field in masks[doc_id]]
+            if await _encode_list_days(doctors, doc_id, slot_dates):
+                retry.append(operation(doc_id))
+            else:
+                logging.error(f"Releasing slots of doctor {doc_id} failed: {error.get('errmsg')}")
+        if retry:
+            modified += (await doctors.bulk_write(retry, ordered=False)).modified_count
+
+    for doc_id, slot_date, slot_time in slots:
+        mark_released(doc_id, slot_date, slot_time)
+    return modified
+
+
+async def prune_past_slots() -> int:
+    """Drop slots_booked entries for dates that have passed, and empty bitmaps."""
+    doctors = get_doctors_collection()
+
+    operations = []
+    pruned = 0
+
+    async for doctor in doctors.find({"slots_booked": {"$ne": {}}}, {"slots_booked": 1}):
+        past, empty = [], []
+        for slot_date, value in (doctor.get("slots_booked") or {}).items():
+            if is_past(slot_date):
+                past.append(_slot_field(slot_date))
+            elif value == 0:
+                empty.append(_slot_field(slot_date))
+        if not past and not empty:
+            continue
+
+        # Empty days are only dropped if nobody booked into them since the read
+        operations.append(UpdateOne(
+            {"_id": doctor["_id"], **{field: 0 for field in empty}},
+            {"$unset": {field: "" for field in past + empty}}
+        ))
+        if len(operations) >= PRUNE_BATCH_SIZE:
+            pruned += (await doctors.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+
+    if operations:
+        pruned += (await doctors.bulk_write(operations, ordered=False)).modified_count
+
+    logging.info(f"✅ Pruned past slots on {pruned} doctors")
+    return pruned
+
+
+async def run_slot_pruning_loop():
+    """Prune on startup and then every PRUNE_INTERVAL seconds."""
+    while True:
+        try:
+            await prune_past_slots()
+        except Exception as e:
+            logging.error(f"❌ Slot pruning failed: {e}")
+        await asyncio.sleep(PRUNE_INTERVAL)
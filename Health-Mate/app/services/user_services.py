@@ -1,11 +1,27 @@
 from fastapi import HTTPException, UploadFile
 from bson import ObjectId
+import asyncio
+import time
 from app.models.user_model import user_collection, user_serializer
 from app.schemas.user_schema import UserRegister, UserLogin, UserUpdate
-from app.core.security import hash_password, verify_password, create_access_token
-from app.core.cloudinary import upload_to_cloudinary
-
-
+from app.core.security import hash_password_async, verify_password_async, create_access_token
+from app.core.storage import upload_file
+from app.core.database import get_appointments_collection, get_doctors_collection
+from app.core.pagination import paginate, InvalidCursorError
+from app.services.slot_services import reserve_slot, release_slot
+from app.services.appointment_services import (
+    user_snapshot,
+    doctor_snapshot,
+    hydrate_appointments,
+    invalidate_user
+)
+from app.models.appointment_model import USER_SNAPSHOT_FIELDS, DOCTOR_SNAPSHOT_FIELDS
+from app.core.counters import record_booking, record_cancellation, record_user_registered
+from app.core.metrics import timed
+from app.core.sessions import store_session
+
+
+@timed
 async def register_user(data: UserRegister):
     existing = await user_collection.find_one({"email": data.email})
     if existing:
@@ -14,28 +30,33 @@ async def register_user(data: UserRegister):
     user = {
         "name": data.name,
         "email": data.email,
-        "password": hash_password(data.password),
+        "password": await hash_password_async(data.password),
         "image": None
     }
 
     result = await user_collection.insert_one(user)
+    await record_user_registered()
     token = create_access_token(str(result.inserted_id))
+    await store_session(str(result.inserted_id), token)
 
     return {"success": True, "token": token}
 
 
+@timed
 async def login_user(data: UserLogin):
     user = await user_collection.find_one({"email": data.email})
     if not user:
         raise HTTPException(400, "Invalid credentials")
 
-    if not verify_password(data.password, user["password"]):
+    if not await verify_password_async(data.password, user["password"]):
         raise HTTPException(400, "Invalid credentials")
 
     token = create_access_token(str(user["_id"]))
+    await store_session(str(user["_id"]), token)
     return {"success": True, "token": token}
 
 
+@timed
 async def get_profile(user_id: str):
     user = await user_collection.find_one(
         {"_id": ObjectId(user_id)}, {"password": 0}
@@ -47,6 +68,7 @@ async def get_profile(user_id: str):
     return {"success": True, "user": user_serializer(user)}
 
 
+@timed
 async def update_profile(
     user_id: str,
     data: UserUpdate,
@@ -55,8 +77,7 @@ async def update_profile(
     update_data = {k: v for k, v in data.dict().items() if v is not None}
 
     if image:
-        upload = upload_to_cloudinary(image.file, f"users/{user_id}")
-        update_data["image"] = upload["secure_url"]
+        update_data["image"] = await upload_file(image, f"users/{user_id}")
 
     if not update_data:
         raise HTTPException(400, "Nothing to update")
@@ -65,15 +86,16 @@ async def update_profile(
         {"_id": ObjectId(user_id)},
         {"$set": update_data}
     )
+    invalidate_user(user_id)
 
     return {"success": True, "message": "Profile updated"}
 
+@timed
 async def upload_user_file(user_id: str, file: UploadFile):
     if not file:
         raise HTTPException(400, "File required")
 
-    upload = upload_to_cloudinary(file.file, f"users/{user_id}")
-    url = upload["secure_url"]
+    url = await upload_file(file, f"users/{user_id}")
 
     await user_collection.update_one(
         {"_id": ObjectId(user_id)},
@@ -84,6 +106,7 @@ async def upload_user_file(user_id: str, file: UploadFile):
 
 
 
+@timed
 async def book_appointment(
     user_id: str,
     doc_id: str,
@@ -91,26 +114,36 @@ async def book_appointment(
     slotTime: str
     ):
 
-    doctor = await doctor_collection.find_one({"_id": ObjectId(doc_id)})
-    if not doctor or not doctor["available"]:
-        raise HTTPException(status_code=400, detail="Doctor Not Available")
-
-    slots = doctor.get("slots_booked", {})
-
-    if slotDate in slots and slotTime in slots[slotDate]:
+    appointment_collection = get_appointments_collection()
+    doctor_collection = get_doctors_collection()
+
+    try:
+        doctor, user = await asyncio.gather(
+            reserve_slot(
+                doc_id, slotDate, slotTime,
+                projection={field: 1 for field in (*DOCTOR_SNAPSHOT_FIELDS, "fees")}
+            ),
+            user_collection.find_one(
+                {"_id": ObjectId(user_id)}, {field: 1 for field in USER_SNAPSHOT_FIELDS}
+            )
+        )
+    except ValueError:
         raise HTTPException(status_code=400, detail="Slot Not Available")
 
-    slots.setdefault(slotDate, []).append(slotTime)
-
-    user = await user_collection.find_one(
-        {"_id": ObjectId(user_id)}, {"password": 0}
-    )
+    if not doctor:
+        # Only the failure path pays for a second read, to report why
+        existing = await doctor_collection.find_one(
+            {"_id": ObjectId(doc_id)}, {"available": 1}
+        )
+        if not existing or not existing.get("available"):
+            raise HTTPException(status_code=400, detail="Doctor Not Available")
+        raise HTTPException(status_code=400, detail="Slot Not Available")
 
     appointment = {
         "userId": user_id,
         "docId": doc_id,
-        "userData": user,
-        "docData": {k: v for k, v in doctor.items() if k != "slots_booked"},
+        "userData": user_snapshot(user),
+        "docData": doctor_snapshot(doctor),
         "amount": doctor["fees"],
         "slotTime": slotTime,
         "slotDate": slotDate,
@@ -118,51 +151,86 @@ async def book_appointment(
         "cancelled": False
     }
 
-    await appointment_collection.insert_one(appointment)
-    await doctor_collection.update_one(
-        {"_id": ObjectId(doc_id)},
-        {"$set": {"slots_booked": slots}}
-    )
+    try:
+        await appointment_collection.insert_one(appointment)
+    except Exception:
+        await release_slot(doc_id, slotDate, slotTime)
+        raise
+
+    await record_booking(doc_id, user_id)
 
     return {"success": True, "message": "Appointment Booked"}
 
+@timed
 async def cancel_appointment(user_id: str, appointment_id: str):
 
+    appointment_collection = get_appointments_collection()
+
     appointment = await appointment_collection.find_one(
         {"_id": ObjectId(appointment_id)}
     )
 
+    if not appointment:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+
     if appointment["userId"] != user_id:
         raise HTTPException(status_code=403, detail="Unauthorized action")
 
-    await appointment_collection.update_one(
-        {"_id": ObjectId(appointment_id)},
+    result = await appointment_collection.update_one(
+        {"_id": ObjectId(appointment_id), "cancelled": {"$ne": True}},
         {"$set": {"cancelled": True}}
     )
 
-    doctor = await doctor_collection.find_one(
-        {"_id": ObjectId(appointment["docId"])}
-    )
+    # Release only on the first cancel, so a repeat cannot free a slot someone else has rebooked
+    if result.modified_count:
+        await release_slot(
+            appointment["docId"], appointment["slotDate"], appointment["slotTime"]
+        )
+        await record_cancellation(appointment["docId"])
 
-    slots = doctor["slots_booked"]
-    slots[appointment["slotDate"]].remove(appointment["slotTime"])
+    return {"success": True, "message": "Appointment Cancelled"}
 
-    await doctor_collection.update_one(
-        {"_id": ObjectId(doctor["_id"])},
-        {"$set": {"slots_booked": slots}}
-    )
+@timed
+async def list_appointments(
+    user_id: str,
+    limit: int = None,
+    cursor: str = None,
+    fetch_all: bool = False
+    ):
 
-    return {"success": True, "message": "Appointment Cancelled"}
+    appointment_collection = get_appointments_collection()
+
+    if fetch_all:
+        appointments = await appointment_collection.find(
+            {"userId": user_id}
+        ).to_list(length=None)
+
+        for appointment in appointments:
+            appointment["_id"] = str(appointment["_id"])
 
-async def list_appointments(user_id: str):
+        await hydrate_appointments(appointments, users=False)
+        return {"success": True, "appointments": appointments}
 
-    appointments = await appointment_collection.find(
-        {"userId": user_id}
-    ).to_list(length=100)
+    try:
+        appointments, next_cursor = await paginate(
+            appointment_collection,
+            {"userId": user_id},
+            limit=limit,
+            cursor=cursor,
+            sort_field="date",
+            direction=-1
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    return {"success": True, "appointments": appointments}
+    for appointment in appointments:
+        appointment["_id"] = str(appointment["_id"])
 
+    await hydrate_appointments(appointments, users=False)
+    return {"success": True, "appointments": appointments, "next_cursor": next_cursor}
 
+
+@timed
 async def upload_user_file(
     file: UploadFile = File(...),
     user_id: str = Depends(get_current_user)
@@ -171,12 +239,7 @@ async def upload_user_file(
         raise HTTPException(status_code=400, detail="File is required")
 
     # Upload to Cloudinary
-    upload_result = upload_to_cloudinary(
-        file.file,
-        folder=f"users/{user_id}"
-    )
-
-    file_url = upload_result["secure_url"]
+    file_url = await upload_file(file, f"users/{user_id}")
 
     # Save file URL in user document
     await user_collection.update_one(
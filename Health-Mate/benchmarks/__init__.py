@@ -0,0 +1,2 @@
+# Standalone benchmarks, run from the Health-Mate directory as
+# python -m benchmarks.<name>
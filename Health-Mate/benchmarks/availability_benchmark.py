@@ -0,0 +1,143 @@
+"""
+Free-slot search latency over a synthetic booking calendar.
+
+    python -m benchmarks.availability_benchmark [--doctors 5000] [--days 90] [--fill 0.3]
+
+Seeds the availability index directly (no Mongo needed) with doctors booked
+at random over the next --days days, then times searches of different date
+ranges and time windows, and the per-booking index updates. A plain scan of
+the slots_booked lists answers the same query as a baseline.
+
+With a light calendar almost every doctor qualifies, and both approaches
+spend their time formatting the returned free slots. A busy calendar (e.g.
+--fill 0.95) shows the cost of finding the doctors that still have room.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from app.core.slots import (
+    SLOTS_PER_DAY,
+    WORKING_HOURS_MASK,
+    bitmap_times,
+    format_slot_date,
+    format_slot_time,
+    parse_slot_time,
+    window_mask,
+)
+from app.services.availability_services import AvailabilityIndex
+from .common import SPECIALITIES, measure, summarize
+
+WORKING_SLOTS = [index for index in range(SLOTS_PER_DAY) if WORKING_HOURS_MASK >> index & 1]
+
+
+def synthetic_calendar(rng: random.Random, days: int, fill: float) -> dict:
+    """slots_booked as stored (one bitmap per date), fill being the share of working slots taken."""
+    today = date.today()
+    calendar = {}
+    for offset in range(days):
+        bitmap = 0
+        for index in WORKING_SLOTS:
+            if rng.random() < fill:
+                bitmap |= 1 << index
+        if bitmap:
+            calendar[format_slot_date(today + timedelta(days=offset))] = bitmap
+    return calendar
+
+
+def scan_search(doctors: list, speciality, start: date, end: date, from_index: int, to_index: int, limit: int) -> list:
+    """The per-doctor, per-day, per-slot walk over slot time lists that the index replaces."""
+    window = [format_slot_time(index) for index in WORKING_SLOTS if from_index <= index < to_index]
+    results = []
+    for doctor in doctors:
+        if speciality and doctor["speciality"] != speciality:
+            continue
+        free_slots = {}
+        day = start
+        while day <= end:
+            slot_date = format_slot_date(day)
+            booked = doctor["booked_times"].get(slot_date, ())
+            free = [slot_time for slot_time in window if slot_time not in booked]
+            if free:
+                free_slots[slot_date] = free
+            day += timedelta(days=1)
+        if free_slots:
+            results.append({"_id": doctor["_id"], "freeSlots": free_slots})
+            if len(results) >= limit:
+                break
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--fill", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    doctors = [
+        {
+            "_id": f"{n:024x}",
+            "name": f"Doctor {n}",
+            "speciality": rng.choice(SPECIALITIES),
+            "fees": 50,
+            "available": True,
+            "slots_booked": synthetic_calendar(rng, args.days, args.fill),
+        }
+        for n in range(args.doctors)
+    ]
+
+    # The scan baseline gets the pre-bitmap list form, decoded up front
+    for doctor in doctors:
+        doctor["booked_times"] = {
+            slot_date: set(bitmap_times(bitmap)) for slot_date, bitmap in doctor["slots_booked"].items()
+        }
+
+    index = AvailabilityIndex()
+    start = time.perf_counter()
+    for doctor in doctors:
+        index.set_doctor(doctor)
+    print(f"Indexed {args.doctors} doctors x {args.days} days in {time.perf_counter() - start:.2f} s")
+
+    today = date.today()
+    tomorrow = today + timedelta(days=1)
+    evening = (parse_slot_time("17:00"), parse_slot_time("21:00"))
+    cases = (
+        ("next 7 days", None, tomorrow, tomorrow + timedelta(days=6), 0, SLOTS_PER_DAY, 50),
+        ("next 7 days, 1 speciality", SPECIALITIES[0], tomorrow, tomorrow + timedelta(days=6), 0, SLOTS_PER_DAY, 50),
+        ("next 89 days, evenings", None, tomorrow, today + timedelta(days=args.days - 1), *evening, 50),
+        ("one day, one slot, all", None, tomorrow, tomorrow, *(parse_slot_time("10:00"),) * 2, args.doctors),
+    )
+
+    for label, speciality, first, last, from_index, to_index, limit in cases:
+        if from_index == to_index:
+            to_index += 1
+        day_window = window_mask(from_index, to_index) & WORKING_HOURS_MASK
+
+        def indexed():
+            return index.search(speciality, first, last, day_window, limit)
+
+        def scanned():
+            return scan_search(doctors, speciality, first, last, from_index, to_index, limit)
+
+        hits = len(indexed())
+        print(f"{label} ({hits} doctors)")
+        print(f"  index  {summarize(measure(indexed, args.repeat))}")
+        print(f"  scan   {summarize(measure(scanned, max(1, args.repeat // 10)))}")
+
+    slot_date = format_slot_date(tomorrow)
+    ids = [doctor["_id"] for doctor in doctors]
+
+    def book_and_release():
+        doc_id = rng.choice(ids)
+        index.book(doc_id, slot_date, "10:00")
+        index.release(doc_id, slot_date, "10:00")
+
+    print(f"book + release  {summarize(measure(book_and_release, args.repeat * 20))}")
+
+
+if __name__ == "__main__":
+    main()
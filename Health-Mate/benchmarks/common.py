@@ -0,0 +1,153 @@
+import os
+import random
+import statistics
+import time
+import uuid
+from bson import ObjectId
+from contextlib import asynccontextmanager
+
+SPECIALITIES = (
+    "General physician", "Gynecologist", "Dermatologist",
+    "Pediatricians", "Neurologist", "Gastroenterologist", "Cardiologist",
+)
+DEGREES = ("MBBS", "MD", "MS", "DNB", "BDS")
+FIRST_NAMES = (
+    "Richard", "Emily", "Sarah", "Christopher", "Jennifer", "Andrew", "Timothy", "Ava",
+    "Jeffrey", "Zoe", "Patrick", "Chloe", "Ryan", "Amelia", "Raj", "Priya", "Ramesh", "Sita",
+)
+LAST_NAMES = (
+    "James", "Larson", "Patel", "Lee", "Garcia", "Davis", "White", "Mitchell",
+    "Kelly", "Kumar", "Sharma", "Rana", "Thapa", "Shrestha", "Adhikari", "Karki",
+)
+ABOUT_WORDS = (
+    "heart", "care", "skin", "child", "brain", "stomach", "preventive", "chronic", "pain",
+    "diabetes", "allergy", "surgery", "family", "women", "health", "treatment", "clinic",
+    "emergency", "nutrition", "sleep", "therapy", "diagnosis", "cardiac", "rash", "migraine",
+)
+
+
+def synthetic_doctor(rng: random.Random, n: int) -> dict:
+    """A doctor document shaped like the doctors collection, with a stable fake id."""
+    return {
+        "_id": f"{n:024x}",
+        "name": f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "speciality": rng.choice(SPECIALITIES),
+        "degree": rng.choice(DEGREES),
+        "about": " ".join(rng.choices(ABOUT_WORDS, k=12)),
+        "fees": rng.randrange(20, 200, 5),
+        "available": rng.random() < 0.8,
+    }
+
+
+def full_doctor(rng: random.Random, n: int, booked_days: int = 60) -> dict:
+    """A complete doctor document as add_doctor stores it, password hash and slot bitmaps included."""
+    doctor = synthetic_doctor(rng, n)
+    doctor["_id"] = ObjectId(doctor["_id"])
+    doctor.update({
+        "email": f"doctor{n}@example.com",
+        "password": "$2b$12$" + "x" * 53,  # a bcrypt hash is 60 characters
+        "image": f"https://res.cloudinary.com/example/image/upload/v1700000000/doctors/{n:08d}.png",
+        "experience": f"{rng.randrange(1, 30)} Years",
+        "about": " ".join(rng.choices(ABOUT_WORDS, k=80)),
+        "address": {"line1": f"{rng.randrange(1, 500)} Ring Road", "line2": "Kathmandu, Nepal"},
+        "date": int(time.time() * 1000),
+        "slots_booked": {
+            f"{day % 28 + 1}_{day // 28 % 12 + 1}_2026": rng.getrandbits(48) for day in range(booked_days)
+        },
+    })
+    return doctor
+
+
+def synthetic_user(rng: random.Random, n: int) -> dict:
+    """A user document shaped like the users collection, with a stable fake id."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    return {
+        "_id": f"{n:024x}",
+        "name": name,
+        "email": f"{name.replace(' ', '.').lower()}.{n}@example.com",
+        "image": "https://res.cloudinary.com/example/image/upload/profile.png",
+        "phone": f"98{rng.randrange(10**8):08d}",
+        "dob": f"19{rng.randrange(50, 99)}-0{rng.randrange(1, 9)}-1{rng.randrange(0, 9)}",
+        "gender": rng.choice(("Male", "Female")),
+        "address": {"line1": f"{rng.randrange(1, 500)} Main Road", "line2": "Kathmandu"},
+    }
+
+
+# Mongo-backed benchmarks run against a throwaway database on this server
+BENCH_MONGO_URL = os.getenv("BENCH_MONGO_URL", "mongodb://localhost:27017")
+
+
+@asynccontextmanager
+async def bench_database(name: str = None, drop: bool = True):
+    """
+    Point app.core.database at a benchmark database for the duration of the block.
+    A fresh name is generated unless one is given; the database is dropped on exit if drop is set.
+    """
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.core import database
+
+    client = AsyncIOMotorClient(BENCH_MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        client.close()
+        raise SystemExit(f"No MongoDB at {BENCH_MONGO_URL} (set BENCH_MONGO_URL): {e}")
+
+    name = name or f"health_mate_bench_{uuid.uuid4().hex[:12]}"
+    previous = database.db
+    database.db = client[name]
+    try:
+        yield database.db
+    finally:
+        database.db = previous
+        if drop:
+            await client.drop_database(name)
+        client.close()
+
+
+async def insert_in_batches(collection, documents, batch_size: int = 5000) -> int:
+    """Insert an iterable of documents without holding them all in memory."""
+    batch = []
+    inserted = 0
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+async def measure_async(func, repeat: int) -> list:
+    """Wall time of repeat awaited calls, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (Linux reports ru_maxrss in KiB)."""
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(func, repeat: int) -> list:
+    """Wall time of repeat calls, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings: list) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50 {statistics.median(ordered):7.3f} ms   p95 {p95:7.3f} ms   max {ordered[-1]:7.3f} ms"
@@ -0,0 +1,131 @@
+"""
+Admin dashboard on a large database: full collection scans vs get_admin_dashboard.
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python -m benchmarks.dashboard_benchmark [--appointments 100000]
+
+Seeds a throwaway database with doctors, users and appointments, then runs each
+variant in its own process so the peak RSS reported belongs to that variant
+alone. "scan" is the dashboard as it used to be written: three find({}) cursors
+drained into lists for len() and the last five appointments. Redis is not
+used, so get_admin_dashboard takes its estimated_document_count fallback.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from .common import (
+    bench_database,
+    insert_in_batches,
+    measure_async,
+    peak_rss_mb,
+    summarize,
+    synthetic_doctor,
+    synthetic_user,
+)
+
+VARIANTS = ("scan", "dashboard")
+
+
+def synthetic_appointment(rng: random.Random, doctor: dict, user: dict) -> dict:
+    """An appointment shaped like the ones book_appointment stores."""
+    return {
+        "userId": user["_id"],
+        "docId": doctor["_id"],
+        "slotDate": f"{rng.randint(1, 28)}_{rng.randint(1, 12)}_2026",
+        "slotTime": rng.choice(("10:00 AM", "10:30 AM", "02:00 PM", "05:30 PM")),
+        "userData": {field: user[field] for field in ("name", "image", "dob")},
+        "docData": {field: doctor[field] for field in ("name", "speciality")},
+        "amount": doctor["fees"],
+        "date": int(time.time() * 1000) - rng.randrange(365 * 24 * 3600 * 1000),
+        "cancelled": rng.random() < 0.1,
+        "payment": rng.random() < 0.5,
+        "isCompleted": rng.random() < 0.3,
+    }
+
+
+async def seed(db, args) -> None:
+    rng = random.Random(args.seed)
+    doctors = [synthetic_doctor(rng, n) for n in range(args.doctors)]
+    users = [synthetic_user(rng, n) for n in range(args.users)]
+    await insert_in_batches(db["doctors"], doctors)
+    await insert_in_batches(db["users"], users)
+    await insert_in_batches(
+        db["appointments"],
+        (synthetic_appointment(rng, rng.choice(doctors), rng.choice(users)) for _ in range(args.appointments)),
+    )
+    # The index ensure_indexes creates for the latest-appointments query
+    await db["appointments"].create_index([("date", -1), ("_id", -1)], name="date")
+
+
+async def scan_dashboard(db) -> dict:
+    """The original implementation, kept here as the baseline."""
+    docs = [doc async for doc in db["doctors"].find({})]
+    user_list = [user async for user in db["users"].find({})]
+    appts = []
+    async for appt in db["appointments"].find({}):
+        appt["_id"] = str(appt["_id"])
+        appts.append(appt)
+    return {
+        "doctors": len(docs),
+        "appointments": len(appts),
+        "patients": len(user_list),
+        "latestAppointments": list(reversed(appts))[:5],
+    }
+
+
+async def run_variant(args) -> None:
+    """Child process: time one variant against an already seeded database."""
+    async with bench_database(args.database, drop=False) as db:
+        if args.variant == "scan":
+            func = lambda: scan_dashboard(db)
+        else:
+            from app.services.admin_services import get_admin_dashboard
+            func = get_admin_dashboard
+
+        rss_before = peak_rss_mb()
+        await func()  # warm the connection pool and server cache
+        timings = await measure_async(func, args.repeat)
+        print(json.dumps({"timings": timings, "rss_before": rss_before, "rss_peak": peak_rss_mb()}))
+
+
+async def run_all(args) -> None:
+    async with bench_database() as db:
+        start = time.perf_counter()
+        await seed(db, args)
+        print(
+            f"seeded {args.doctors} doctors, {args.users} users, {args.appointments} appointments "
+            f"in {time.perf_counter() - start:.1f} s"
+        )
+
+        for variant in VARIANTS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.dashboard_benchmark",
+                 "--variant", variant, "--database", db.name, "--repeat", str(args.repeat)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{variant:<10} {summarize(result['timings'])}   "
+                f"peak RSS {result['rss_peak']:7.1f} MiB (+{result['rss_peak'] - result['rss_before']:.1f} during runs)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=100000)
+    parser.add_argument("--doctors", type=int, default=500)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    asyncio.run(run_variant(args) if args.variant else run_all(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Login storm vs unrelated traffic: does bcrypt stall the event loop?
+
+    python -m benchmarks.login_load_benchmark --email doctor@example.com --password secret \\
+        [--base-url http://127.0.0.1:8000] [--logins 32] [--listers 4] [--duration 10]
+
+Needs a running server (uvicorn app.main:app) with a doctor account to log in
+as. Two phases run against it: /api/doctor/list on its own, then the same list
+traffic while --logins clients hammer /api/doctor/login. With hashing on the
+event loop every login blocks the list requests queued behind it and the
+second phase's list p95 climbs by roughly one bcrypt call per concurrent
+login; with the hashing pool it should stay close to the first phase. Point
+it at a checkout from before and after the pool to compare the two.
+
+Uses a bare asyncio HTTP/1.1 client so no extra dependency is needed.
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+from .common import summarize
+
+
+async def request(host: str, port: int, method: str, path: str, body: dict = None) -> int:
+    """One request on a fresh connection; returns the status code once the full response is read."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+        )
+        writer.write(head.encode() + payload)
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()  # drain headers and body until the server closes
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def client_loop(stop: float, call) -> tuple[list, int]:
+    """Call repeatedly until the deadline; returns (latencies in ms, non-2xx count)."""
+    timings, errors = [], 0
+    while time.perf_counter() < stop:
+        start = time.perf_counter()
+        try:
+            status = await call()
+        except OSError:
+            status = 0
+        timings.append((time.perf_counter() - start) * 1000)
+        if not 200 <= status < 300:
+            errors += 1
+    return timings, errors
+
+
+async def phase(args, host: str, port: int, logins: int) -> None:
+    list_call = lambda: request(host, port, "GET", "/api/doctor/list")
+    login_body = {"email": args.email, "password": args.password}
+    login_call = lambda: request(host, port, "POST", "/api/doctor/login", login_body)
+
+    stop = time.perf_counter() + args.duration
+    results = await asyncio.gather(
+        *[client_loop(stop, list_call) for _ in range(args.listers)],
+        *[client_loop(stop, login_call) for _ in range(logins)],
+    )
+    list_results, login_results = results[:args.listers], results[args.listers:]
+
+    list_timings = [t for timings, _ in list_results for t in timings]
+    list_errors = sum(errors for _, errors in list_results)
+    print(f"  list   {len(list_timings):6d} requests  {summarize(list_timings)}   errors {list_errors}")
+    if logins:
+        login_timings = [t for timings, _ in login_results for t in timings]
+        login_errors = sum(errors for _, errors in login_results)
+        print(f"  login  {len(login_timings):6d} requests  {summarize(login_timings)}   errors {login_errors}")
+
+
+async def run(args) -> None:
+    url = urlsplit(args.base_url)
+    host, port = url.hostname, url.port or 80
+
+    # Fail early on a wrong URL or account rather than timing errors
+    if await request(host, port, "POST", "/api/doctor/login", {"email": args.email, "password": args.password}) != 200:
+        raise SystemExit("Login failed; check --base-url, --email and --password")
+
+    print(f"list only ({args.listers} clients, {args.duration:.0f} s)")
+    await phase(args, host, port, logins=0)
+    print(f"list + login storm ({args.listers} list clients, {args.logins} login clients, {args.duration:.0f} s)")
+    await phase(args, host, port, logins=args.logins)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--listers", type=int, default=4, help="concurrent /api/doctor/list clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per phase")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Doctor listings: bytes fetched with and without response-model projections.
+
+    python -m benchmarks.projection_benchmark [--doctors 1000]
+    BENCH_MONGO_URL=mongodb://localhost:27017 python -m benchmarks.projection_benchmark --mongo
+
+"fetch then pop" is how the listings used to work: whole documents (password
+hash, email and the slots_booked bitmaps included) read and trimmed in Python.
+The projected variants use model_projection on the response models, as
+doctor_services does. Without --mongo the projections are applied to
+synthetic documents locally and the BSON the server would send is measured;
+with --mongo the documents are seeded into a throwaway database and the bytes
+actually returned and the listing latency are reported.
+"""
+import argparse
+import asyncio
+import random
+import bson
+from app.models.doctor_model import DoctorPublicResponse, DoctorResponse
+from app.models.projection import model_projection
+from .common import bench_database, full_doctor, insert_in_batches, measure_async, summarize
+
+VARIANTS = {
+    "fetch then pop": None,
+    "DoctorResponse": model_projection(DoctorResponse),
+    "DoctorPublicResponse": model_projection(DoctorPublicResponse),
+}
+
+
+def project(document: dict, projection: dict | None) -> dict:
+    """What an inclusion projection leaves of a document; _id is always kept."""
+    if projection is None:
+        return document
+    return {field: value for field, value in document.items() if field == "_id" or field in projection}
+
+
+def report(label: str, documents: list, baseline: int = None) -> int:
+    size = sum(len(bson.encode(document)) for document in documents)
+    saved = f"   {100 * (1 - size / baseline):5.1f}% less" if baseline else ""
+    print(f"  {label:<22} {size / len(documents):7.0f} B/doctor  {size / 1024:8.0f} KiB total{saved}")
+    return size
+
+
+def offline(doctors: list) -> None:
+    print(f"{len(doctors)} doctors, projected locally")
+    baseline = None
+    for label, projection in VARIANTS.items():
+        size = report(label, [project(doctor, projection) for doctor in doctors], baseline)
+        baseline = baseline or size
+
+
+async def with_mongo(args, doctors: list) -> None:
+    async with bench_database() as db:
+        await insert_in_batches(db["doctors"], doctors)
+
+        print(f"{len(doctors)} doctors, listed from MongoDB")
+        baseline = None
+        for label, projection in VARIANTS.items():
+            def listing():
+                return db["doctors"].find({}, projection).to_list(length=None)
+
+            documents = await listing()
+            size = report(label, documents, baseline)
+            baseline = baseline or size
+            print(f"  {'':<22} {summarize(await measure_async(listing, args.repeat))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=1000)
+    parser.add_argument("--booked-days", type=int, default=60, help="days with slot bitmaps per doctor")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo", action="store_true", help="also list from BENCH_MONGO_URL")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    doctors = [full_doctor(rng, n, args.booked_days) for n in range(args.doctors)]
+    offline(doctors)
+    if args.mongo:
+        asyncio.run(with_mongo(args, doctors))
+
+
+if __name__ == "__main__":
+    main()
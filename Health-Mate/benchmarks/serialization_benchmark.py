@@ -0,0 +1,74 @@
+"""
+Response encoding: orjson dumps vs FastAPI's jsonable_encoder + json.dumps.
+
+    python -m benchmarks.serialization_benchmark [--appointments 10000]
+
+Encodes a list of synthetic appointments shaped like the stored documents
+(ObjectId ids, embedded user/doctor snapshots), as the list endpoints return them.
+"""
+import argparse
+import json
+import random
+import timeit
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from app.core.responses import dumps
+from .common import SPECIALITIES
+
+
+def synthetic_appointment(rng: random.Random) -> dict:
+    return {
+        "_id": ObjectId(),
+        "userId": str(ObjectId()),
+        "docId": str(ObjectId()),
+        "slotDate": f"{rng.randint(1, 28)}_{rng.randint(1, 12)}_2026",
+        "slotTime": rng.choice(("10:00 AM", "10:30 AM", "02:00 PM", "05:30 PM")),
+        "userData": {"name": "Patient Name", "image": "https://example.com/u.png", "phone": "9800000000"},
+        "docData": {
+            "name": "Dr. Doctor Name",
+            "image": "https://example.com/d.png",
+            "speciality": rng.choice(SPECIALITIES),
+            "fees": rng.randrange(20, 200, 5),
+        },
+        "amount": rng.randrange(20, 200, 5),
+        "date": 1_760_000_000_000 + rng.randrange(10**9),
+        "cancelled": rng.random() < 0.1,
+        "payment": rng.random() < 0.5,
+        "isCompleted": rng.random() < 0.3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=10000)
+    parser.add_argument("--number", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payload = {"success": True, "appointments": [synthetic_appointment(rng) for _ in range(args.appointments)]}
+
+    def stdlib():
+        # What JSONResponse does for a plain return value
+        return json.dumps(
+            jsonable_encoder(payload, custom_encoder={ObjectId: str}),
+            ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode()
+
+    def fast():
+        return dumps(payload)
+
+    assert json.loads(stdlib()) == json.loads(fast())
+
+    timings = {}
+    for label, func in (("jsonable_encoder + json.dumps", stdlib), ("orjson dumps", fast)):
+        best = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        timings[label] = best / args.number * 1000
+        print(f"{label:<30} {timings[label]:8.2f} ms   {len(func()) / 1024:8.0f} KiB")
+
+    print(f"{'speedup':<30} {timings['jsonable_encoder + json.dumps'] / timings['orjson dumps']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Appointment size and listing cost: full embedded profiles vs compact snapshots.
+
+    python -m benchmarks.snapshot_benchmark [--page 1000]
+    BENCH_MONGO_URL=mongodb://localhost:27017 python -m benchmarks.snapshot_benchmark --mongo
+
+"full" is an appointment as book_appointment used to store it, with the user
+document (minus password) and the doctor document (minus slots_booked)
+copied in. "compact" keeps only the snapshot fields from appointment_model.
+Without --mongo the comparison is offline: BSON bytes per appointment and per
+page, and the time to decode a page as the driver would. With --mongo both
+shapes are seeded into a throwaway database and a page is listed the way the
+services do it, with the compact page then hydrated by hydrate_appointments
+from a cold profile cache (its worst case).
+"""
+import argparse
+import asyncio
+import random
+import time
+import bson
+from bson import ObjectId
+from app.models.appointment_model import USER_SNAPSHOT_FIELDS, DOCTOR_SNAPSHOT_FIELDS
+from .common import (
+    bench_database,
+    full_doctor,
+    insert_in_batches,
+    measure,
+    measure_async,
+    summarize,
+    synthetic_user,
+)
+
+
+def appointment(rng: random.Random, doctor: dict, user: dict, compact: bool) -> dict:
+    if compact:
+        user_data = {field: user[field] for field in USER_SNAPSHOT_FIELDS if field in user}
+        doc_data = {field: doctor[field] for field in DOCTOR_SNAPSHOT_FIELDS if field in doctor}
+    else:
+        user_data = dict(user)
+        doc_data = {field: value for field, value in doctor.items() if field != "slots_booked"}
+    return {
+        "_id": ObjectId(),
+        "userId": str(user["_id"]),
+        "docId": str(doctor["_id"]),
+        "userData": user_data,
+        "docData": doc_data,
+        "amount": doctor["fees"],
+        "slotTime": "10:30 AM",
+        "slotDate": f"{rng.randint(1, 28)}_{rng.randint(1, 12)}_2026",
+        "date": int(time.time() * 1000) - rng.randrange(10**10),
+        "cancelled": False,
+        "payment": rng.random() < 0.5,
+        "isCompleted": False,
+    }
+
+
+def build(args):
+    rng = random.Random(args.seed)
+    doctors = [full_doctor(rng, n) for n in range(args.doctors)]
+    users = []
+    for n in range(args.users):
+        user = synthetic_user(rng, n)
+        user["_id"] = ObjectId(user["_id"])
+        users.append(user)
+    pairs = [(rng.choice(doctors), rng.choice(users)) for _ in range(args.page)]
+    shapes = {
+        label: [appointment(rng, doctor, user, compact) for doctor, user in pairs]
+        for label, compact in (("full", False), ("compact", True))
+    }
+    return doctors, users, shapes
+
+
+def offline(args, shapes: dict) -> None:
+    print(f"per page of {args.page} appointments")
+    for label, appts in shapes.items():
+        encoded = b"".join(bson.encode(appt) for appt in appts)
+        timings = measure(lambda: bson.decode_all(encoded), args.repeat)
+        print(
+            f"  {label:<8} {len(encoded) / len(appts):7.0f} B/appointment  {len(encoded) / 1024:8.0f} KiB/page   "
+            f"decode {summarize(timings)}"
+        )
+
+
+async def with_mongo(args, doctors: list, users: list, shapes: dict) -> None:
+    from app.services import appointment_services
+
+    async with bench_database() as db:
+        await insert_in_batches(db["doctors"], doctors)
+        await insert_in_batches(db["users"], users)
+        for label, appts in shapes.items():
+            await insert_in_batches(db[f"appointments_{label}"], appts)
+
+        def listing(label: str):
+            return db[f"appointments_{label}"].find({}).sort("date", -1).limit(args.page).to_list(length=args.page)
+
+        async def hydrated():
+            appointment_services._user_cache.clear()
+            appointment_services._doctor_cache.clear()
+            await appointment_services.hydrate_appointments(await listing("compact"))
+
+        print(f"listing a page of {args.page} from MongoDB")
+        for label, func in (
+            ("full", lambda: listing("full")),
+            ("compact", lambda: listing("compact")),
+            ("compact + hydrate", hydrated),
+        ):
+            await func()
+            print(f"  {label:<18} {summarize(await measure_async(func, args.repeat))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=1000, help="appointments per listing page")
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo", action="store_true", help="also time listings against BENCH_MONGO_URL")
+    args = parser.parse_args()
+
+    doctors, users, shapes = build(args)
+    offline(args, shapes)
+    if args.mongo:
+        asyncio.run(with_mongo(args, doctors, users, shapes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+In-memory doctor search index.
+
+Results must not depend on which cached matches a search happens to find:
+every test compares against the order and counts the index documents, after
+doctors are added, edited and removed between searches.
+"""
+import random
+import re
+from collections import Counter
+from app.services.search_services import DoctorSearchIndex, FIELD_WEIGHTS, term_pattern, tokenize
+
+
+def doctor(n: int, name: str, **fields) -> dict:
+    return {
+        "_id": f"{n:024x}",
+        "name": name,
+        "speciality": "Cardiologist",
+        "degree": "MBBS",
+        "about": "heart care",
+        "fees": 50,
+        "available": True,
+        **fields,
+    }
+
+
+def names(result: dict) -> list:
+    return [doctor["name"] for doctor in result["doctors"]]
+
+
+def expected(index: DoctorSearchIndex, q: str = None, **filters) -> tuple[list, int, dict]:
+    """Brute-force ids, total and facets for a search, straight from the indexed documents."""
+    terms = tokenize(q)
+    rows = []
+    for doc_id, entry in index.doctors.items():
+        info = entry["info"]
+        weights = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(info.get(field)):
+                weights[token] += weight
+
+        if terms:
+            if any(term not in weights for term in terms[:-1]):
+                continue
+            prefixed = [weight for token, weight in weights.items() if token.startswith(terms[-1])]
+            if not prefixed:
+                continue
+            # Each full term scores its weight; the prefix term scores its best token
+            score = sum(weights[term] for term in terms[:-1]) + max(prefixed)
+        else:
+            score = 0
+
+        if filters.get("speciality") and info["speciality"] != filters["speciality"]:
+            continue
+        if filters.get("available") is not None and info.get("available", True) != filters["available"]:
+            continue
+        if filters.get("min_fee") is not None and info["fees"] < filters["min_fee"]:
+            continue
+        if filters.get("max_fee") is not None and info["fees"] > filters["max_fee"]:
+            continue
+        rows.append((-score, info["name"], doc_id, info))
+
+    rows.sort(key=lambda row: row[:3])
+    available_count = sum(1 for row in rows if row[3].get("available", True))
+    facets = {
+        "speciality": dict(Counter(row[3]["speciality"] for row in rows)),
+        "degree": dict(Counter(row[3]["degree"] for row in rows)),
+        "available": {"true": available_count, "false": len(rows) - available_count},
+    }
+    return [row[2] for row in rows], len(rows), facets
+
+
+def assert_matches_brute_force(index: DoctorSearchIndex, q: str = None, limit: int = 20, **filters):
+    result = index.search(q=q, limit=limit, **filters)
+    ids, total, facets = expected(index, q, **filters)
+    assert [doctor["_id"] for doctor in result["doctors"]] == ids[:limit]
+    assert result["total"] == total
+    assert result["facets"] == facets
+
+
+def test_name_order_follows_adds_renames_and_removals():
+    index = DoctorSearchIndex()
+    index.set_doctor(doctor(1, "Zed"))
+    index.set_doctor(doctor(2, "Bob"))
+    # Fill the match cache before the writes below
+    assert names(index.search(q="he")) == ["Bob", "Zed"]
+    assert names(index.search()) == ["Bob", "Zed"]
+
+    index.set_doctor(doctor(3, "Amy"))
+    assert names(index.search(q="he")) == ["Amy", "Bob", "Zed"]
+    assert names(index.search(q="heart")) == ["Amy", "Bob", "Zed"]
+
+    index.set_doctor(doctor(1, "Abe"))
+    assert names(index.search(q="he")) == ["Abe", "Amy", "Bob"]
+    assert names(index.search()) == ["Abe", "Amy", "Bob"]
+
+    index.remove_doctor(doctor(3, "Amy")["_id"])
+    assert names(index.search(q="he")) == ["Abe", "Bob"]
+    assert names(index.search()) == ["Abe", "Bob"]
+
+
+def test_prefix_order_survives_writes_to_other_tokens():
+    index = DoctorSearchIndex()
+    index.set_doctor(doctor(1, "Aa", about="skin"))
+    index.set_doctor(doctor(2, "Ab", about="skin"))
+    index.set_doctor(doctor(3, "Bob", about="heart"))
+    index.set_doctor(doctor(4, "Zed", about="health"))
+    assert names(index.search(q="hea")) == ["Bob", "Zed"]
+
+    # None of these writes touch "heart", but they shift every doctor's place in the name order
+    index.remove_doctor(doctor(1, "Aa")["_id"])
+    index.remove_doctor(doctor(2, "Ab")["_id"])
+    index.set_doctor(doctor(5, "Zz", about="health"))
+    assert names(index.search(q="hea")) == ["Bob", "Zed", "Zz"]
+
+
+def test_weight_ranks_before_name():
+    index = DoctorSearchIndex()
+    index.set_doctor(doctor(1, "Amy", about="skin"))
+    index.set_doctor(doctor(2, "Bob", about="heart"))
+    index.set_doctor(doctor(3, "Heart Clinic", about="skin"))
+    assert names(index.search(q="heart")) == ["Heart Clinic", "Bob"]
+
+    # Editing the text moves a doctor in and out of cached matches
+    index.set_doctor(doctor(1, "Amy", about="heart heart"))
+    assert names(index.search(q="heart")) == ["Heart Clinic", "Amy", "Bob"]
+    index.set_doctor(doctor(3, "Clinic", about="skin"))
+    assert names(index.search(q="heart")) == ["Amy", "Bob"]
+
+
+def test_fee_range_is_inclusive_and_follows_fee_changes():
+    index = DoctorSearchIndex()
+    for n, fees in enumerate((20, 50, 50, 80, 120)):
+        index.set_doctor(doctor(n, f"Doctor {n}", fees=fees))
+
+    assert names(index.search(min_fee=50, max_fee=80)) == ["Doctor 1", "Doctor 2", "Doctor 3"]
+    assert names(index.search(max_fee=20)) == ["Doctor 0"]
+    assert names(index.search(min_fee=100)) == ["Doctor 4"]
+
+    index.set_doctor(doctor(1, "Doctor 1", fees=200))
+    index.remove_doctor(doctor(3, "Doctor 3")["_id"])
+    assert names(index.search(min_fee=50, max_fee=80)) == ["Doctor 2"]
+    assert names(index.search(min_fee=100, q="heart")) == ["Doctor 1", "Doctor 4"]
+
+
+def test_facet_counts_follow_availability_and_speciality_changes():
+    index = DoctorSearchIndex()
+    index.set_doctor(doctor(1, "Amy"))
+    index.set_doctor(doctor(2, "Bob", speciality="Dermatologist", degree="MD"))
+    index.set_doctor(doctor(3, "Cid", available=False))
+    assert index.search(q="heart")["facets"] == {
+        "speciality": {"Cardiologist": 2, "Dermatologist": 1},
+        "degree": {"MBBS": 2, "MD": 1},
+        "available": {"true": 2, "false": 1},
+    }
+
+    index.set_doctor(doctor(3, "Cid", available=True))
+    index.set_doctor(doctor(2, "Bob"))
+    assert index.search(q="heart")["facets"] == {
+        "speciality": {"Cardiologist": 3},
+        "degree": {"MBBS": 3},
+        "available": {"true": 3, "false": 0},
+    }
+
+    index.remove_doctor(doctor(1, "Amy")["_id"])
+    result = index.search(q="heart", available=True)
+    assert result["total"] == 2
+    assert result["facets"]["speciality"] == {"Cardiologist": 2}
+
+
+def test_cached_matches_stay_exact_through_random_writes():
+    rng = random.Random(7)
+    words = ("heart", "health", "care", "cardiac", "skin", "child", "chronic", "pain")
+    first_names = ("Amy", "Bob", "Cid", "Dee", "Eve", "Raj", "Rana", "Zed")
+    specialities = ("Cardiologist", "Dermatologist", "Neurologist")
+    queries = (
+        {"q": "heart"}, {"q": "he"}, {"q": "c"}, {"q": "heart ca"}, {"q": "care chronic p"},
+        {"q": "ra"}, {}, {"q": "h", "available": True}, {"q": "skin", "speciality": "Dermatologist"},
+        {"q": "ca", "min_fee": 40, "max_fee": 90},
+    )
+
+    index = DoctorSearchIndex()
+    for _ in range(300):
+        n = rng.randrange(40)
+        if rng.random() < 0.2:
+            index.remove_doctor(f"{n:024x}")
+        else:
+            index.set_doctor(doctor(
+                n,
+                f"{rng.choice(first_names)} {rng.choice(words).title()}",
+                speciality=rng.choice(specialities),
+                about=" ".join(rng.choices(words, k=4)),
+                fees=rng.randrange(20, 120, 10),
+                available=rng.random() < 0.7,
+            ))
+        params = rng.choice(queries)
+        assert_matches_brute_force(index, limit=5, **params)
+
+    for params in queries:
+        assert_matches_brute_force(index, limit=50, **params)
+
+
+def test_term_pattern_agrees_with_tokenize():
+    texts = (
+        "Heart-care clinic", "The heartland doctor", "Dr. Theo Thapa", "care4kids", "cardiac_care",
+        "Heart", "theatre and the arts", "MBBS, MD",
+    )
+    for text in texts:
+        tokens = tokenize(text)
+        for term in ("heart", "care", "the", "theo", "md", "kids", "cardiac"):
+            if term in ("the",):
+                continue  # stopwords never reach the patterns
+            found = re.search(term_pattern(term, prefix=False), text, re.IGNORECASE) is not None
+            assert found == (term in tokens), (text, term)
+        for prefix in ("he", "th", "ca", "m", "t", "a"):
+            found = re.search(term_pattern(prefix, prefix=True), text, re.IGNORECASE) is not None
+            assert found == any(token.startswith(prefix) for token in tokens), (text, prefix)
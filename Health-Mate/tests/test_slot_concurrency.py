@@ -0,0 +1,142 @@
+"""
+Concurrent bookings against a real MongoDB.
+
+The guarantee under test is the one reserve_slot documents: the $bitsAnySet
+filter and the $bit update run as one document update, so any number of
+simultaneous requests for the same slot produce exactly one booking.
+
+Needs a mongod; set TEST_MONGO_URL (default mongodb://localhost:27017).
+Each test uses a throwaway database that is dropped afterwards. The tests are
+skipped when the driver is not installed or no server answers.
+"""
+import asyncio
+import os
+import uuid
+from datetime import date, timedelta
+import pytest
+
+motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+
+from bson import ObjectId
+from app.core import database
+from app.core.slots import (
+    WORKING_HOURS_MASK,
+    SLOTS_PER_DAY,
+    format_slot_date,
+    format_slot_time,
+    parse_slot_time,
+    slot_mask,
+)
+from app.services.slot_services import release_slot, release_slots, reserve_slot
+
+TEST_MONGO_URL = os.getenv("TEST_MONGO_URL", "mongodb://localhost:27017")
+CONCURRENT_REQUESTS = 200
+
+SLOT_DATE = format_slot_date(date.today() + timedelta(days=1))
+
+
+def run_with_database(test):
+    """Run an async test body against a fresh database holding one available doctor."""
+    async def runner():
+        client = motor_asyncio.AsyncIOMotorClient(TEST_MONGO_URL, serverSelectionTimeoutMS=2000)
+        try:
+            await client.admin.command("ping")
+        except Exception as e:
+            client.close()
+            pytest.skip(f"No MongoDB at {TEST_MONGO_URL}: {e}")
+
+        name = f"health_mate_test_{uuid.uuid4().hex[:12]}"
+        previous = database.db
+        database.db = client[name]
+        try:
+            result = await database.db["doctors"].insert_one(
+                {"name": "Dr. Test", "available": True, "slots_booked": {}}
+            )
+            await test(str(result.inserted_id))
+        finally:
+            database.db = previous
+            await client.drop_database(name)
+            client.close()
+
+    asyncio.run(runner())
+
+
+async def booked_bitmap(doc_id: str) -> int:
+    doctor = await database.db["doctors"].find_one({"_id": ObjectId(doc_id)})
+    return int(doctor["slots_booked"].get(SLOT_DATE, 0))
+
+
+def test_same_slot_is_booked_exactly_once():
+    async def body(doc_id):
+        results = await asyncio.gather(*[
+            reserve_slot(doc_id, SLOT_DATE, "10:00 AM") for _ in range(CONCURRENT_REQUESTS)
+        ])
+
+        assert sum(result is not None for result in results) == 1
+        assert await booked_bitmap(doc_id) == slot_mask(parse_slot_time("10:00 AM"))
+
+    run_with_database(body)
+
+
+def test_distinct_slots_are_all_booked():
+    async def body(doc_id):
+        slots = [index for index in range(SLOTS_PER_DAY) if WORKING_HOURS_MASK >> index & 1]
+        # Several requests per slot, interleaved, so slots race each other as well as themselves
+        requests = [format_slot_time(index) for index in slots] * 5
+
+        results = await asyncio.gather(*[
+            reserve_slot(doc_id, SLOT_DATE, slot_time) for slot_time in requests
+        ])
+
+        assert sum(result is not None for result in results) == len(slots)
+        assert await booked_bitmap(doc_id) == WORKING_HOURS_MASK
+
+    run_with_database(body)
+
+
+def test_unavailable_doctor_is_never_booked():
+    async def body(doc_id):
+        await database.db["doctors"].update_one({"_id": ObjectId(doc_id)}, {"$set": {"available": False}})
+
+        results = await asyncio.gather(*[
+            reserve_slot(doc_id, SLOT_DATE, "10:00 AM") for _ in range(CONCURRENT_REQUESTS)
+        ])
+
+        assert all(result is None for result in results)
+        assert await booked_bitmap(doc_id) == 0
+
+    run_with_database(body)
+
+
+def test_days_still_stored_as_lists_are_converted_on_write():
+    async def body(doc_id):
+        # A day written before the bitmap encoding, as the encode-slots migration would find it
+        await database.db["doctors"].update_one(
+            {"_id": ObjectId(doc_id)}, {"$set": {f"slots_booked.{SLOT_DATE}": ["10:00 AM", "11:00 AM"]}}
+        )
+        booked = slot_mask(parse_slot_time("10:00 AM")) | slot_mask(parse_slot_time("11:00 AM"))
+
+        results = await asyncio.gather(*[
+            reserve_slot(doc_id, SLOT_DATE, "10:00 AM") for _ in range(CONCURRENT_REQUESTS)
+        ])
+        assert all(result is None for result in results)
+        assert await booked_bitmap(doc_id) == booked
+
+        assert await reserve_slot(doc_id, SLOT_DATE, "12:00 PM") is not None
+        assert await release_slot(doc_id, SLOT_DATE, "10:00 AM")
+        assert not await release_slot(doc_id, SLOT_DATE, "10:00 AM")
+        assert await booked_bitmap(doc_id) == slot_mask(parse_slot_time("11:00 AM")) | slot_mask(parse_slot_time("12:00 PM"))
+
+    run_with_database(body)
+
+
+def test_bulk_release_converts_days_still_stored_as_lists():
+    async def body(doc_id):
+        await database.db["doctors"].update_one(
+            {"_id": ObjectId(doc_id)}, {"$set": {f"slots_booked.{SLOT_DATE}": ["10:00 AM", "11:00 AM"]}}
+        )
+
+        assert await release_slots([(doc_id, SLOT_DATE, "10:00 AM")]) == 1
+        assert await booked_bitmap(doc_id) == slot_mask(parse_slot_time("11:00 AM"))
+
+    run_with_database(body)